@@ -0,0 +1,306 @@
+# Step Tools
+# Copyright (C) 2025 VGmove
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Benchmark StepTools operators on synthetic scenes.
+#
+#   blender -b --factory-startup --python benchmarks/bench_step_tools.py -- \
+#       --objects 100 1000 5000 --slots 1 4 --materials shared unique --output bench.json
+#
+# Works with the "bpy" Python module as well:
+#
+#   python benchmarks/bench_step_tools.py --objects 1000
+#
+# Every operator runs on a freshly generated scene. Results (time, peak memory,
+# datablock counts) are written to JSON, --baseline compares with earlier results.
+# --render adds EEVEE/Cycles render times (including shader compilation) of
+# unanimated StepTools materials before and after "Finalize for Render".
+# --playback adds the time per frame of a keyed blink, keys on every object
+# versus one controller.
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+import bpy
+
+try:
+	import resource
+except ImportError:
+	resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import step_tools
+
+DATABLOCKS = ("objects", "meshes", "materials", "node_groups", "actions")
+
+# Scene
+def create_scene(objects, slots, materials, strip_length, marker_step):
+	# Keep add-on registered, only remove generated data
+	bpy.data.batch_remove([id for name in DATABLOCKS for id in getattr(bpy.data, name)])
+	scene = bpy.context.scene
+	scene.timeline_markers.clear()
+	scene.sequence_editor_clear()
+	scene.animation_data_clear()
+	scene.frame_current = 1
+
+	# Shared mesh with shared materials, unique materials are linked to objects
+	mesh = bpy.data.meshes.new("Bench")
+	mesh.from_pydata([(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0)], [], [(0, 1, 2, 3)])
+	for slot in range(slots):
+		mesh.materials.append(create_material(f"Bench_{slot}"))
+
+	for i in range(objects):
+		object = bpy.data.objects.new(f"Bench_{i:05d}", mesh)
+		object.location = (i % 100, i // 100, 0)
+		scene.collection.objects.link(object)
+		if materials == "unique":
+			for index, slot in enumerate(object.material_slots):
+				slot.link = "OBJECT"
+				slot.material = create_material(f"Bench_{i}_{index}")
+		object.select_set(True)
+	bpy.context.view_layer.objects.active = scene.objects[0] if objects else None
+
+	# Image strip and 'P' markers
+	if strip_length:
+		scene.sequence_editor_create()
+		strip = scene.sequence_editor.sequences.new_image("Bench", "//frames/0001.png", 1, 1)
+		for frame in range(2, strip_length + 1):
+			strip.elements.append(f"{frame:04d}.png")
+		strip.select = True
+		scene.sequence_editor.active_strip = strip
+		for frame in range(marker_step, strip_length, marker_step):
+			scene.timeline_markers.new("P", frame=frame)
+	return scene
+
+def create_material(name):
+	material = bpy.data.materials.new(name)
+	material.use_nodes = True
+	return material
+
+def count_datablocks():
+	return {name: len(getattr(bpy.data, name)) for name in DATABLOCKS}
+
+def peak_rss():
+	# Whole process peak so far: kilobytes on Linux, bytes on macOS
+	return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None
+
+# Operators
+def run_main():
+	bpy.ops.action.steptools_main()
+
+def run_blink():
+	bpy.ops.action.steptools_blink()
+
+def run_blink_repeat():
+	# Second run on prepared materials
+	bpy.ops.action.steptools_blink()
+	bpy.context.scene.frame_current += 100
+	bpy.ops.action.steptools_blink()
+
+def run_transparent(transparent_type):
+	def run():
+		bpy.context.scene.property.transparent_type = transparent_type
+		bpy.ops.action.steptools_transparent()
+	return run
+
+def run_marker_save():
+	path = os.path.join(tempfile.mkdtemp(), "markers")
+	bpy.ops.action.steptools_marker_save(filepath=path)
+
+def run_pause():
+	path = os.path.join(tempfile.mkdtemp(), "markers")
+	bpy.ops.action.steptools_marker_save(filepath=path)
+	bpy.ops.action.steptools_pause(filepath=path + ".jsonl")
+
+OPERATORS = {
+	"main": run_main,
+	"blink": run_blink,
+	"blink_repeat": run_blink_repeat,
+	"transparent_blink": run_transparent("blink"),
+	"fade_in": run_transparent("fade_in"),
+	"fade_inout": run_transparent("fade_inout"),
+	"marker_save": run_marker_save,
+	"pause": run_pause,
+}
+
+def measure(name, config, args):
+	times = []
+	result = {"operator": name, **config}
+	rss_before = peak_rss()
+	try:
+		# Timed runs without tracing overhead
+		for repeat in range(args.repeat):
+			create_scene(**config)
+			before = count_datablocks()
+			start = time.perf_counter()
+			OPERATORS[name]()
+			times.append(time.perf_counter() - start)
+		after = count_datablocks()
+
+		# Separate run for Python memory
+		create_scene(**config)
+		tracemalloc.start()
+		try:
+			OPERATORS[name]()
+			python_peak = tracemalloc.get_traced_memory()[1]
+		finally:
+			tracemalloc.stop()
+	except Exception as error:
+		result.update(status="error", error=f"{type(error).__name__}: {error}")
+		return result
+
+	rss_after = peak_rss()
+	result.update(
+		status="ok",
+		seconds=min(times),
+		seconds_all=times,
+		python_peak_kb=python_peak // 1024,
+		process_peak_rss=rss_after,
+		process_peak_rss_growth=rss_after - rss_before if resource else None,
+		datablocks_before=before,
+		datablocks_after=after,
+	)
+	return result
+
+# Render cost of injected group
+def render_engines():
+	engines = bpy.types.RenderSettings.bl_rna.properties["engine"].enum_items.keys()
+	eevee = "BLENDER_EEVEE_NEXT" if "BLENDER_EEVEE_NEXT" in engines else "BLENDER_EEVEE"
+	return [eevee, "CYCLES"] if "CYCLES" in engines else [eevee]
+
+def render_benchmark(config):
+	scene = create_scene(**config)
+	camera = bpy.data.objects.new("Camera", bpy.data.cameras.new("Camera"))
+	camera.data.type = "ORTHO"
+	camera.data.ortho_scale = 110
+	camera.location = (50, 5, 50)
+	scene.collection.objects.link(camera)
+	scene.camera = camera
+	scene.render.resolution_x = 320
+	scene.render.resolution_y = 240
+	if hasattr(scene, "cycles"):
+		scene.cycles.samples = 4
+
+	# Materials are injected but never animated
+	bpy.ops.action.steptools_main()
+	results = []
+	for stage in ("before", "after"):
+		if stage == "after":
+			bpy.ops.action.steptools_finalize_render()
+		for engine in render_engines():
+			scene.render.engine = engine
+			start = time.perf_counter()
+			bpy.ops.render.render()
+			results.append({"operator": f"render_{engine.lower()}_{stage}", **config,
+							"status": "ok", "seconds": time.perf_counter() - start})
+	return results
+
+# Evaluation cost per frame of keyed objects
+def playback_benchmark(config, frames):
+	results = []
+	for use_controller in (False, True):
+		scene = create_scene(**config)
+		scene.property.use_controller = use_controller
+		scene.property.transparent_type = "blink"
+		bpy.ops.action.steptools_transparent()
+		scene.property.use_controller = False
+
+		# Keyed range is evaluated frame by frame
+		start = time.perf_counter()
+		for frame in range(1, frames + 1):
+			scene.frame_set(frame)
+		results.append({"operator": "playback_controller" if use_controller else "playback_objects", **config,
+						"status": "ok", "seconds": (time.perf_counter() - start) / frames})
+	return results
+
+def compare(results, baseline_path, threshold):
+	with open(baseline_path, encoding="utf-8") as f:
+		baseline = json.load(f)["results"]
+
+	def key(result):
+		return (result["operator"], result["objects"], result["slots"], result["materials"], result["strip_length"])
+
+	previous = {key(result): result for result in baseline if result.get("status") == "ok"}
+	regressions = []
+	for result in results:
+		old = previous.get(key(result))
+		if result.get("status") != "ok" or old is None:
+			continue
+		ratio = result["seconds"] / max(old["seconds"], 1e-9)
+		result["baseline_ratio"] = round(ratio, 3)
+		if ratio > threshold:
+			regressions.append(result)
+	return regressions
+
+def main(argv):
+	parser = argparse.ArgumentParser(description="Benchmark StepTools operators")
+	parser.add_argument("--objects", type=int, nargs="+", default=[100, 1000])
+	parser.add_argument("--slots", type=int, nargs="+", default=[1])
+	parser.add_argument("--materials", nargs="+", default=["shared", "unique"], choices=["shared", "unique"])
+	parser.add_argument("--strip", type=int, default=1000, help="Image strip length in frames")
+	parser.add_argument("--marker-step", type=int, default=50, help="Frames between 'P' markers")
+	parser.add_argument("--operators", nargs="+", default=list(OPERATORS), choices=list(OPERATORS))
+	parser.add_argument("--repeat", type=int, default=3)
+	parser.add_argument("--output", default="bench_results.json")
+	parser.add_argument("--baseline", help="Earlier results .json for comparison")
+	parser.add_argument("--threshold", type=float, default=1.25, help="Slowdown ratio reported as regression")
+	parser.add_argument("--render", action="store_true", help="Benchmark render before and after finalize")
+	parser.add_argument("--playback", type=int, default=0, help="Frames of playback benchmark (own keys versus controller)")
+	args = parser.parse_args(argv)
+
+	step_tools.register()
+	results = []
+	for objects in args.objects:
+		for slots in args.slots:
+			for materials in args.materials:
+				config = dict(objects=objects, slots=slots, materials=materials,
+							  strip_length=args.strip, marker_step=args.marker_step)
+				for name in args.operators:
+					result = measure(name, config, args)
+					results.append(result)
+					print(f"{name:>18} {objects:>6} obj {slots} slot {materials:>6}: "
+						  f"{result.get('seconds', float('nan')):.4f}s {result['status']}")
+				if args.render:
+					for result in render_benchmark(config):
+						results.append(result)
+						print(f"{result['operator']:>18} {objects:>6} obj {slots} slot {materials:>6}: {result['seconds']:.4f}s")
+				if args.playback:
+					for result in playback_benchmark(config, args.playback):
+						results.append(result)
+						print(f"{result['operator']:>18} {objects:>6} obj {slots} slot {materials:>6}: {result['seconds']:.6f}s/frame")
+
+	regressions = compare(results, args.baseline, args.threshold) if args.baseline else []
+	with open(args.output, "w", encoding="utf-8") as f:
+		json.dump({
+			"blender": bpy.app.version_string,
+			"addon": step_tools.bl_info["version"],
+			"results": results,
+			"regressions": [result["operator"] for result in regressions],
+		}, f, indent=2)
+
+	for result in regressions:
+		print(f"Regression: {result['operator']} {result['objects']} obj x{result['baseline_ratio']}")
+	return 1 if regressions else 0
+
+if __name__ == "__main__":
+	argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+	code = main(argv)
+	if bpy.app.background:
+		sys.exit(code)
@@ -25,22 +25,87 @@ bl_info = {
 }
 
 import os
+import re
 import bpy
+import glob
+import json
+import time
+import cProfile
+import tempfile
+import numpy as np
 from collections import Counter
+from fnmatch import fnmatchcase
+from contextlib import contextmanager
+from bpy.app.handlers import persistent
 from bpy.props import (StringProperty,
 					   BoolProperty,
 					   IntProperty,
 					   FloatProperty,
 					   EnumProperty,
 					   PointerProperty,
+					   CollectionProperty,
 					   FloatVectorProperty,
 					   )
 from bpy.types import (Menu,
 					   Panel,
+					   UIList,
 					   Operator,
 					   PropertyGroup,
+					   AddonPreferences,
 					   )
 
+# Step list
+STEP_PARAMETERS = ("blend_blink", "duration_blink", "count_blink", "color_blink",
+				   "blend_transparent", "duration_fade", "count_transparent_blink", "delay_length")
+
+class StepTools_step_object(PropertyGroup):
+	object: PointerProperty(type=bpy.types.Object)
+	offset: IntProperty(name="Offset", description="Start offset of object (cascade)")
+
+class StepTools_step(PropertyGroup):
+	step_type: EnumProperty(
+		name="Type:",
+		items= (
+			("color", "Color Blink", "Blink with color"),
+			("blink", "Transparent Blink", "Blink with transparency"),
+			("fade_in", "Fade In", "Show an object"),
+			("fade_out", "Fade Out", "Hide an object"),
+			("fade_inout", "Fade In/Out", "Show and hide an object")
+		)
+	)
+	frame_start: IntProperty(name="Start:", description="First frame of step")
+	keyed_type: StringProperty(options={'HIDDEN'})
+	keyed_start: IntProperty(options={'HIDDEN'})
+	keyed_end: IntProperty(options={'HIDDEN'})
+	objects: CollectionProperty(type=StepTools_step_object)
+
+	# Parameters (same names as scene properties)
+	blend_blink: FloatProperty(name="Blend:", default = 0.9, min = 0.5, max = 1)
+	duration_blink: IntProperty(name="Duration:", default = 12, min = 2, max = 100)
+	count_blink: IntProperty(name="Count:", default = 2, min = 1, max = 100)
+	color_blink: FloatVectorProperty(name="Color", subtype = "COLOR", default = (1.0,0.0,0.0,1.0), size = 4, min = 0, max = 1)
+	blend_transparent: FloatProperty(name="Blend:", default = 1.0, min = 0.5, max = 1)
+	duration_fade: IntProperty(name="Duration:", default = 12, min = 3, max = 100)
+	count_transparent_blink: IntProperty(name="Count:", default = 2, min = 1, max = 100)
+	delay_length: IntProperty(name="Delay length:", default = 2, min = 2, max = 10)
+	palette_index: IntProperty(name="Palette Color:", description="Palette color of blink (0 uses own color)", default = 0, min = 0, max = 8)
+
+# Blink palette, read by node group from scene properties
+PALETTE_SIZE = 8
+
+def sync_palette(scene):
+	palette = scene.property.palette
+	for index in range(PALETTE_SIZE):
+		color = tuple(palette[index].color) if index < len(palette) else (1.0, 0.0, 0.0)
+		scene[f"StepTools_Palette_{index + 1}"] = color
+	scene.update_tag()
+
+def update_palette(self, context):
+	sync_palette(context.scene)
+
+class StepTools_palette_color(PropertyGroup):
+	color: FloatVectorProperty(name="Color", subtype = "COLOR", default = (1.0, 0.0, 0.0), size = 3, min = 0, max = 1, update=update_palette)
+
 # Scene Properties
 class StepTools_properties(PropertyGroup):
 	step_type: EnumProperty(
@@ -121,6 +186,25 @@ class StepTools_properties(PropertyGroup):
 		max = 10
 	)
 
+	# Property for stagger
+	stagger_order: EnumProperty(
+		name="Cascade:",
+		items= (
+			("none", "None", "All objects start on the current frame"),
+			("name", "Name", "Offset objects ordered by name"),
+			("cursor", "3D Cursor", "Offset objects ordered by distance from the 3D cursor"),
+			("selection", "Selection", "Offset objects in selection order")
+		),
+		default = "none"
+	)
+	stagger_frames: IntProperty(
+		name="Offset:",
+		description="Frames between the start of neighbouring objects",
+		default = 2,
+		min = 0,
+		max = 100
+	)
+
 	# Property for pause
 	duration_pause: IntProperty(
 		name="Duration:",
@@ -151,6 +235,951 @@ class StepTools_properties(PropertyGroup):
 		description="Make single user for data object",
 		default = False
 	)
+	zero_copy: BoolProperty(
+		name="Zero Copy",
+		description="Keep materials and data shared, copy only linked materials that cannot be edited",
+		default = False
+	)
+	bulk_keying: BoolProperty(
+		name="Bulk Keying",
+		description="Write keyframes directly to F-Curves instead of inserting them one by one",
+		default = True
+	)
+	defer_updates: BoolProperty(
+		name="Deferred Updates",
+		description="Tag each object once after keying and move the cursor without evaluating the scene",
+		default = True
+	)
+	use_controller: BoolProperty(
+		name="Controller",
+		description="Set keyframes on one controller, selected objects follow it in the shader without own keys",
+		default = False
+	)
+	record_steps: BoolProperty(
+		name="Record Steps",
+		description="Add each keying run to the step list for later editing",
+		default = False
+	)
+	steps: CollectionProperty(type=StepTools_step)
+	step_index: IntProperty(name="Step")
+	auto_hide: BoolProperty(
+		name="Auto Hide",
+		description="Key viewport and render visibility to hide objects while they are fully transparent (objects with own visibility animation are skipped)",
+		default = False
+	)
+	use_palette: BoolProperty(
+		name="Use Palette",
+		description="Key one palette index per object instead of its own RGB color",
+		default = False
+	)
+	palette: CollectionProperty(type=StepTools_palette_color)
+	palette_active: IntProperty(name="Palette Color")
+	compact_keys: BoolProperty(
+		name="Compact Keys",
+		description="Remove redundant StepTools keys of keyed objects after each run",
+		default = False
+	)
+	log_timings: BoolProperty(
+		name="Log Timings",
+		description="Keep timings of recent runs in the 'StepTools Log' text",
+		default = False
+	)
+
+# Addon Preferences
+class StepTools_preferences(AddonPreferences):
+	bl_idname = __name__
+
+	profile_next_run: BoolProperty(
+		name="Profile Next Run",
+		description="Profile the next keying run with cProfile and save the stats file",
+		default = False
+	)
+	profile_directory: StringProperty(
+		name="Profile Directory",
+		description="Directory for profile stats (temporary directory if empty)",
+		subtype="DIR_PATH"
+	)
+
+	def draw(self, context):
+		layout = self.layout
+		row = layout.row()
+		row.prop(self, "profile_next_run")
+		row.prop(self, "profile_directory", text="")
+
+# Keyframes
+DATA_PATH_PREFIX = '["StepTools_'
+PROPERTY_NAMES = ("StepTools_Blink", "StepTools_Blink_Color", "StepTools_Blink_Index", "StepTools_Transparent")
+KEYFRAME_ARRAYS = (
+	("co", 2, np.float32),
+	("handle_left", 2, np.float32),
+	("handle_right", 2, np.float32),
+	("interpolation", 1, np.int32),
+	("handle_left_type", 1, np.int32),
+	("handle_right_type", 1, np.int32),
+)
+
+def has_fcurve(object, data_path):
+	action = object.animation_data.action if object.animation_data else None
+	return action is not None and action.fcurves.find(data_path) is not None
+
+def get_fcurve(object, data_path, index=0, group=""):
+	# Get or create action (same name as keyframe_insert)
+	if object.animation_data is None:
+		object.animation_data_create()
+	action = object.animation_data.action
+	if action is None:
+		action = bpy.data.actions.new(object.name + "Action")
+		object.animation_data.action = action
+
+	fcurve = action.fcurves.find(data_path, index=index)
+	if fcurve is None:
+		fcurve = action.fcurves.new(data_path, index=index, action_group=group)
+	return fcurve
+
+def write_fcurve(fcurve, frames, values):
+	points = fcurve.keyframe_points
+	frames = np.asarray(frames, dtype=np.float32)
+	values = np.asarray(values, dtype=np.float32)
+
+	# Remove points on the same frames (keyframe_insert replace them)
+	count = len(points)
+	if count:
+		co = np.empty(count * 2, dtype=np.float32)
+		points.foreach_get("co", co)
+		for index in np.flatnonzero(np.isin(co[0::2], frames))[::-1]:
+			points.remove(points[int(index)], fast=True)
+		count = len(points)
+
+	# Append new points and write all coordinates at once
+	points.add(len(frames))
+	co = np.empty(len(points) * 2, dtype=np.float32)
+	points.foreach_get("co", co)
+	co[count * 2::2] = frames
+	co[count * 2 + 1::2] = values
+	points.foreach_set("co", co)
+
+	# Sort points and recalculate handles
+	fcurve.update()
+	return len(frames)
+
+# Copy of all keyframe points for restore
+def read_keyframes(fcurve):
+	points = fcurve.keyframe_points
+	data = {}
+	for name, size, dtype in KEYFRAME_ARRAYS:
+		data[name] = np.empty(len(points) * size, dtype=dtype)
+		points.foreach_get(name, data[name])
+	return data
+
+def restore_keyframes(fcurve, data):
+	points = fcurve.keyframe_points
+	points.clear()
+	points.add(len(data["co"]) // 2)
+	for name, size, dtype in KEYFRAME_ARRAYS:
+		points.foreach_set(name, data[name])
+	fcurve.update()
+
+def remove_keyframes(fcurve, frame_start, frame_end):
+	co = np.empty(len(fcurve.keyframe_points) * 2, dtype=np.float32)
+	fcurve.keyframe_points.foreach_get("co", co)
+	keep = (co[0::2] < frame_start) | (co[0::2] > frame_end)
+	if keep.all():
+		return 0
+
+	# Rebuild curve from kept points
+	data = read_keyframes(fcurve)
+	for name, size, dtype in KEYFRAME_ARRAYS:
+		data[name] = data[name].reshape(-1, size)[keep].ravel()
+	restore_keyframes(fcurve, data)
+	return int((~keep).sum())
+
+def shift_keyframes(fcurve, frame_start, delta):
+	points = fcurve.keyframe_points
+	co = np.empty(len(points) * 2, dtype=np.float32)
+	points.foreach_get("co", co)
+	shift = co[0::2] >= frame_start
+	if not shift.any():
+		return 0
+
+	# Move points with their handles
+	for name in ("co", "handle_left", "handle_right"):
+		array = np.empty(len(points) * 2, dtype=np.float32)
+		points.foreach_get(name, array)
+		array[0::2][shift] += delta
+		points.foreach_set(name, array)
+	fcurve.update()
+	return int(shift.sum())
+
+# Remove keys on colliding frames and keys inside flat runs
+def compact_keyframes(fcurve):
+	points = fcurve.keyframe_points
+	if len(points) < 2:
+		return 0
+	co = np.empty(len(points) * 2, dtype=np.float32)
+	points.foreach_get("co", co)
+	frames = co[0::2]
+	values = co[1::2]
+
+	# Last key wins on the same frame (as keyframe_insert)
+	keep = np.ones(len(frames), dtype=bool)
+	keep[:-1] = ~np.isclose(frames[:-1], frames[1:])
+
+	# Middle keys of equal values do not change the curve
+	kept = np.flatnonzero(keep)
+	equal = np.isclose(values[kept][1:], values[kept][:-1], atol=1e-6)
+	keep[kept[1:-1][equal[:-1] & equal[1:]]] = False
+
+	# Curve that never changes needs only one key
+	if equal.all() and fcurve.extrapolation == 'CONSTANT':
+		keep[kept[1:]] = False
+	if keep.all():
+		return 0
+
+	data = read_keyframes(fcurve)
+	for name, size, dtype in KEYFRAME_ARRAYS:
+		data[name] = data[name].reshape(-1, size)[keep].ravel()
+	restore_keyframes(fcurve, data)
+	return int((~keep).sum())
+
+def compact_curves(fcurves):
+	removed = 0
+	for fcurve in fcurves:
+		removed += compact_keyframes(fcurve)
+	return removed
+
+def insert_keyframes(context, object, name, frames, values):
+	data_path = f'["{name}"]'
+	defer_updates = context.scene.property.defer_updates
+	if not context.scene.property.bulk_keying:
+		for frame, value in zip(np.asarray(frames).tolist(), np.asarray(values).tolist()):
+			object[name] = value
+			if not defer_updates:
+				tag_update(object)
+			object.keyframe_insert(data_path=data_path, frame=frame)
+		return np.asarray(values).size
+
+	# One F-Curve per array item (color)
+	values = np.asarray(values, dtype=np.float32).reshape(len(frames), -1)
+	for index in range(values.shape[1]):
+		write_fcurve(get_fcurve(object, data_path, index), frames, values[:, index])
+
+	# Keep property value as after last inserted keyframe, int property stays int (UI data is kept)
+	if values.shape[1] > 1:
+		object[name] = values[-1].tolist()
+	elif isinstance(object.get(name), int):
+		object[name] = int(round(float(values[-1, 0])))
+	else:
+		object[name] = float(values[-1, 0])
+	if not defer_updates:
+		tag_update(object)
+	return values.size
+
+# Timings of operator phases
+class PhaseTimer:
+	def __init__(self):
+		self.phases = {}
+
+	@contextmanager
+	def phase(self, name):
+		start = time.perf_counter()
+		try:
+			yield
+		finally:
+			self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+	def summary(self):
+		return ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in self.phases.items())
+
+LOG_NAME = "StepTools Log"
+LOG_LINES = 200
+
+def write_log(line):
+	text = bpy.data.texts.get(LOG_NAME) or bpy.data.texts.new(LOG_NAME)
+	text.write(time.strftime("%Y-%m-%d %H:%M:%S ") + line + "\n")
+	if len(text.lines) > LOG_LINES + 1:
+		lines = [text_line.body for text_line in text.lines]
+		text.from_string("\n".join(lines[-LOG_LINES - 1:]))
+
+@contextmanager
+def profile_run(context):
+	# Path of saved stats is set after the run
+	result = {"path": None}
+	addon = context.preferences.addons.get(__name__)
+	preferences = addon.preferences if addon else None
+	if preferences is None or not preferences.profile_next_run:
+		yield result
+		return
+
+	# Profile a single run
+	profile = cProfile.Profile()
+	profile.enable()
+	try:
+		yield result
+	finally:
+		profile.disable()
+		preferences.profile_next_run = False
+		directory = bpy.path.abspath(preferences.profile_directory) or tempfile.gettempdir()
+		path = os.path.join(directory, time.strftime("steptools_%Y%m%d_%H%M%S.prof"))
+		profile.dump_stats(path)
+		result["path"] = path
+
+# Updates requested by operator (depsgraph is evaluated after it returns)
+update_counts = Counter()
+
+def tag_update(object):
+	update_counts["update_tag"] += 1
+	object.update_tag()
+
+def set_frame(scene, frame):
+	update_counts["frame_set"] += 1
+	scene.frame_set(frame)
+
+class UpdateCounter:
+	def __enter__(self):
+		self.start = update_counts.copy()
+		self.updates = 0
+		self.frame_changes = 0
+		return self
+
+	def __exit__(self, *args):
+		self.updates = update_counts["update_tag"] - self.start["update_tag"]
+		self.frame_changes = update_counts["frame_set"] - self.start["frame_set"]
+
+	def summary(self):
+		return f"update_tag calls {self.updates}, frame_set calls {self.frame_changes}"
+
+# Depsgraph update that follows the operator, measured once by handlers
+depsgraph_stats = {}
+depsgraph_watch = {"label": None, "start": None, "log": False}
+
+def watch_depsgraph(context, label):
+	depsgraph_watch.update(label=label, start=None, log=context.scene.property.log_timings)
+	if depsgraph_start not in bpy.app.handlers.depsgraph_update_pre:
+		bpy.app.handlers.depsgraph_update_pre.append(depsgraph_start)
+	if depsgraph_done not in bpy.app.handlers.depsgraph_update_post:
+		bpy.app.handlers.depsgraph_update_post.append(depsgraph_done)
+
+def unwatch_depsgraph():
+	if depsgraph_start in bpy.app.handlers.depsgraph_update_pre:
+		bpy.app.handlers.depsgraph_update_pre.remove(depsgraph_start)
+	if depsgraph_done in bpy.app.handlers.depsgraph_update_post:
+		bpy.app.handlers.depsgraph_update_post.remove(depsgraph_done)
+
+def depsgraph_start(*args):
+	if depsgraph_watch["start"] is None:
+		depsgraph_watch["start"] = time.perf_counter()
+
+def depsgraph_done(scene, depsgraph):
+	unwatch_depsgraph()
+	start = depsgraph_watch["start"]
+	depsgraph_stats.update(
+		label=depsgraph_watch["label"],
+		updates=len(depsgraph.updates),
+		seconds=time.perf_counter() - start if start is not None else 0.0,
+	)
+	if depsgraph_watch["log"]:
+		write_log(f"{depsgraph_stats['label']}: {depsgraph_summary()}")
+
+def depsgraph_summary():
+	return f"depsgraph update after run: {depsgraph_stats['updates']} IDs, {depsgraph_stats['seconds'] * 1000:.0f}ms"
+
+# Node group
+GROUP_NAME = "StepTools"
+GROUP_VERSION = 5
+GROUP_PATTERN = re.compile(r"^StepTools(\.\d+)?$")
+
+def get_group():
+	# One shared group for all materials, rebuilt in place on version change
+	group = bpy.data.node_groups.get(GROUP_NAME)
+	if group is None or group.bl_idname != "ShaderNodeTree":
+		group = bpy.data.node_groups.new(GROUP_NAME, "ShaderNodeTree")
+	if group.get("StepTools_Version") != GROUP_VERSION:
+		build_group(group)
+		group["StepTools_Version"] = GROUP_VERSION
+	return group
+
+def build_group(group):
+	# Keep sockets so existing material links stay connected
+	group.nodes.clear()
+	sockets = {(item.in_out, item.name) for item in group.interface.items_tree if item.item_type == "SOCKET"}
+	if ("INPUT", "Shader") not in sockets:
+		group.interface.new_socket(name="Shader", description="Shader Input", in_out ="INPUT", socket_type="NodeSocketShader")
+	if ("OUTPUT", "Shader") not in sockets:
+		group.interface.new_socket(name="Shader", description="Shader Output", in_out ="OUTPUT", socket_type="NodeSocketShader")
+
+	# Create input \ output nodes
+	group_input : bpy.types.ShaderNodeGroup = group.nodes.new("NodeGroupInput")
+	group_input.location = (0, 5)
+	group_output : bpy.types.ShaderNodeGroup = group.nodes.new("NodeGroupOutput")
+	group_output.location = (1200, 0)
+	
+	# Nodes for blink
+	mix_shader_blink = group.nodes.new("ShaderNodeMixShader")
+	mix_shader_blink.location = (600,50)
+	mix_shader_blink_inputs = [input for input in mix_shader_blink.inputs if input.name == "Shader"]
+	
+	emission_shader = group.nodes.new("ShaderNodeEmission")
+	emission_shader.location = (300, -200)
+	
+	attr_blink = add_attribute(group, "StepTools_Blink", (300, 500))
+	attr_blink_color = add_attribute(group, "StepTools_Blink_Color", (0, -130))
+	attr_blink_index = add_attribute(group, "StepTools_Blink_Index", (-300, -700))
+	
+	# Nodes for transparency
+	mix_shader_transparent = group.nodes.new("ShaderNodeMixShader")
+	mix_shader_transparent.location = (900,50)
+	mix_shader_transparent_inputs = [input for input in mix_shader_transparent.inputs if input.name == "Shader"]
+	
+	transparent_shader = group.nodes.new("ShaderNodeBsdfTransparent")
+	transparent_shader.location = (600, -200)
+	transparent_shader.inputs["Color"].default_value = (1, 1, 1, 0)
+	
+	attr_transparent = add_attribute(group, "StepTools_Transparent", (600, 500))
+	
+	# Followers add values of their controller slot (scene properties), own values stay 0
+	attr_follow = add_attribute(group, FOLLOW_NAME, (-600, 1500))
+	values = {
+		"StepTools_Blink": attr_blink.outputs["Fac"],
+		"StepTools_Transparent": attr_transparent.outputs["Fac"],
+		"StepTools_Blink_Index": attr_blink_index.outputs["Fac"],
+	}
+	color_output = attr_blink_color.outputs["Color"]
+	for slot in range(1, CONTROLLER_SLOTS + 1):
+		follow = group.nodes.new("ShaderNodeMath")
+		follow.location = (-600 + slot * 400, 1500)
+		follow.operation = 'COMPARE'
+		follow.inputs[1].default_value = slot
+		follow.inputs[2].default_value = 0.5
+		group.links.new(attr_follow.outputs["Fac"], follow.inputs[0])
+		for row, name in enumerate(values):
+			attr_controller = add_controller_attribute(group, slot, name, (-800 + slot * 400, 1300 - row * 200))
+			add_value = group.nodes.new("ShaderNodeMath")
+			add_value.location = (-600 + slot * 400, 1300 - row * 200)
+			add_value.operation = 'MULTIPLY_ADD'
+			group.links.new(attr_controller.outputs["Fac"], add_value.inputs[0])
+			group.links.new(follow.outputs["Value"], add_value.inputs[1])
+			group.links.new(values[name], add_value.inputs[2])
+			values[name] = add_value.outputs["Value"]
+		attr_controller = add_controller_attribute(group, slot, "StepTools_Blink_Color", (-800 + slot * 400, 700))
+		mix_controller = group.nodes.new("ShaderNodeMix")
+		mix_controller.location = (-600 + slot * 400, 700)
+		mix_controller.data_type = 'RGBA'
+		mix_controller_inputs = [input for input in mix_controller.inputs if input.type == 'RGBA']
+		group.links.new(follow.outputs["Value"], mix_controller.inputs["Factor"])
+		group.links.new(color_output, mix_controller_inputs[0])
+		group.links.new(attr_controller.outputs["Color"], mix_controller_inputs[1])
+		color_output = [output for output in mix_controller.outputs if output.type == 'RGBA'][0]
+
+	# Create link
+	group.links.new(group_input.outputs["Shader"], mix_shader_blink_inputs[0])
+	group.links.new(values["StepTools_Blink"], mix_shader_blink.inputs["Fac"])
+
+	# Palette color replaces own color when index is set
+	for index in range(1, PALETTE_SIZE + 1):
+		attr_palette = group.nodes.new(type='ShaderNodeAttribute')
+		attr_palette.location = (-300 + index * 200, -1000)
+		attr_palette.attribute_type = 'VIEW_LAYER'
+		attr_palette.attribute_name = f'["StepTools_Palette_{index}"]'
+		compare = group.nodes.new("ShaderNodeMath")
+		compare.location = (-300 + index * 200, -800)
+		compare.operation = 'COMPARE'
+		compare.inputs[1].default_value = index
+		compare.inputs[2].default_value = 0.5
+		mix_palette = group.nodes.new("ShaderNodeMix")
+		mix_palette.location = (-300 + index * 200, -600)
+		mix_palette.data_type = 'RGBA'
+		mix_palette_inputs = [input for input in mix_palette.inputs if input.type == 'RGBA']
+		group.links.new(values["StepTools_Blink_Index"], compare.inputs[0])
+		group.links.new(compare.outputs["Value"], mix_palette.inputs["Factor"])
+		group.links.new(color_output, mix_palette_inputs[0])
+		group.links.new(attr_palette.outputs["Color"], mix_palette_inputs[1])
+		color_output = [output for output in mix_palette.outputs if output.type == 'RGBA'][0]
+	group.links.new(color_output, emission_shader.inputs["Color"]) 
+	group.links.new(emission_shader.outputs["Emission"], mix_shader_blink_inputs[1])
+	
+	group.links.new(mix_shader_blink.outputs["Shader"], mix_shader_transparent_inputs[0])
+	group.links.new(values["StepTools_Transparent"], mix_shader_transparent.inputs["Fac"])
+	group.links.new(transparent_shader.outputs["BSDF"], mix_shader_transparent_inputs[1])
+	group.links.new(mix_shader_transparent.outputs["Shader"], group_output.inputs["Shader"])
+	return group
+
+def add_attribute(group, name, location):
+	# Value of collection instance empty, falls back to object itself
+	attribute = group.nodes.new(type='ShaderNodeAttribute')
+	attribute.location = location
+	attribute.attribute_type = 'INSTANCER'
+	attribute.attribute_name = f'["{name}"]'
+	return attribute
+
+def add_controller_attribute(group, slot, name, location):
+	# Value of controller slot, looked up in view layer, scene and world
+	attribute = group.nodes.new(type='ShaderNodeAttribute')
+	attribute.location = location
+	attribute.attribute_type = 'VIEW_LAYER'
+	attribute.attribute_name = f'["{controller_property(slot, name)}"]'
+	return attribute
+
+def find_group_node(material_nodes):
+	# Named node of current version, or "Group.NNN" node of older versions
+	group_node = material_nodes.get(GROUP_NAME)
+	if group_node is not None and group_node.type == "GROUP":
+		return group_node
+	return next((node for node in material_nodes if node.type == "GROUP" and node.node_tree
+				 and GROUP_PATTERN.match(node.node_tree.name)), None)
+
+def eject_group(material):
+	# Remove group node and restore original Surface link
+	material_nodes = material.node_tree.nodes
+	links = material.node_tree.links
+	group_node = find_group_node(material_nodes)
+	if group_node is not None:
+		from_sockets = [link.from_socket for link in group_node.inputs[0].links]
+		to_sockets = [link.to_socket for link in group_node.outputs[0].links]
+		material_nodes.remove(group_node)
+		for to_socket in to_sockets:
+			if to_socket.node.type == "OUTPUT_MATERIAL":
+				to_socket.node.location.x -= 250
+			if from_sockets:
+				links.new(from_sockets[0], to_socket)
+	if "StepTools_Injected" in material:
+		del material["StepTools_Injected"]
+	return group_node is not None
+
+# Collection instances
+def is_instancer(object):
+	return object.instance_type == 'COLLECTION' and object.instance_collection is not None
+
+def instance_objects(object):
+	# Objects of instanced collection, nested instances included
+	objects = {}
+	collections = [object.instance_collection] if is_instancer(object) else []
+	seen = set()
+	while collections:
+		collection = collections.pop()
+		if collection in seen:
+			continue
+		seen.add(collection)
+		for child in collection.all_objects:
+			if child.data is not None:
+				objects[child] = True
+			if is_instancer(child):
+				collections.append(child.instance_collection)
+	return list(objects)
+
+# Render cost
+FACTOR_PATHS = ('["StepTools_Blink"]', '["StepTools_Transparent"]')
+
+def is_animated(object):
+	# Followers are animated by their controller
+	if object.get(FOLLOW_NAME):
+		return True
+
+	# StepTools factors leave default value 0.0
+	if any(object.get(name, 0.0) != 0.0 for name in ("StepTools_Blink", "StepTools_Transparent")):
+		return True
+	animation_data = object.animation_data
+	if animation_data is None:
+		return False
+	if any(fcurve.data_path in FACTOR_PATHS for fcurve in animation_data.drivers):
+		return True
+	if animation_data.action:
+		for fcurve in animation_data.action.fcurves:
+			if fcurve.data_path in FACTOR_PATHS and len(fcurve.keyframe_points):
+				co = np.empty(len(fcurve.keyframe_points) * 2, dtype=np.float32)
+				fcurve.keyframe_points.foreach_get("co", co)
+				if np.any(co[1::2] != 0.0):
+					return True
+	return False
+
+def unanimated_materials():
+	# Injected materials without animated users
+	animated = {}
+
+	# Materials of animated collection instances
+	for object in bpy.data.objects:
+		if is_instancer(object) and is_animated(object):
+			for child in instance_objects(object):
+				for slot in child.material_slots:
+					if slot.material and slot.material.get("StepTools_Injected"):
+						animated[slot.material] = True
+
+	for object in bpy.data.objects:
+		object_animated = None
+		for slot in object.material_slots:
+			material = slot.material
+			if material is None or not material.get("StepTools_Injected") or animated.get(material):
+				continue
+			if object_animated is None:
+				object_animated = is_animated(object)
+			animated[material] = object_animated
+	return [material for material, value in animated.items() if not value]
+
+# Approximate memory of datablock copy
+def estimate_size(id):
+	if isinstance(id, bpy.types.Mesh):
+		return len(id.vertices) * 32 + len(id.edges) * 8 + len(id.loops) * 24 + len(id.polygons) * 16
+	if isinstance(id, bpy.types.Material):
+		return 4096 + (len(id.node_tree.nodes) * 2048 if id.node_tree else 0)
+	if isinstance(id, bpy.types.NodeTree):
+		return 1024 + len(id.nodes) * 2048
+	if isinstance(id, bpy.types.Action):
+		return 1024 + sum(curve_size(fcurve) for fcurve in id.fcurves)
+	if isinstance(id, bpy.types.Object):
+		return 2048
+	return 0
+
+def curve_size(fcurve):
+	# F-Curve with BezTriple keys
+	return 256 + len(fcurve.keyframe_points) * 72
+
+# Controller
+CONTROLLER_NAME = "StepTools_Controller"
+FOLLOW_NAME = "StepTools_Follow"
+CONTROLLER_SLOTS = 4 # Each slot adds nodes to the group
+
+def controller_property(slot, name):
+	# Scene property of slot, e.g. "StepTools_Controller_1_Blink"
+	return f"{CONTROLLER_NAME}_{slot}{name[len('StepTools'):]}"
+
+def controller_followers():
+	# Controllers (slot in property) and objects that follow them (slot in own property)
+	controllers = {object[CONTROLLER_NAME]: object for object in bpy.data.objects if object.get(CONTROLLER_NAME)}
+	followers = {controller: set() for controller in controllers.values()}
+	for object in bpy.data.objects:
+		controller = controllers.get(object.get(FOLLOW_NAME))
+		if controller is not None:
+			followers[controller].add(object)
+	return followers
+
+def controller_state():
+	return {"followers": controller_followers(), "keyed": {}}
+
+def keyable_objects(objects):
+	# Objects that get keys: with node material, or collection instance
+	return [object for object in objects if (object.data is None and is_instancer(object)) or (object.data is not None
+			and any(slot.material and slot.material.use_nodes for slot in object.material_slots))]
+
+def has_keys(object, data_paths):
+	action = object.animation_data.action if object.animation_data else None
+	return action is not None and any(fcurve.data_path in data_paths and len(fcurve.keyframe_points) for fcurve in action.fcurves)
+
+def plan_controller(objects, key_properties, state):
+	# Controller that drives exactly these objects, None for a new one
+	selected = set(objects)
+	followers = state["followers"]
+	controller = next((controller for controller, members in followers.items() if members == selected), None)
+	if controller is not None:
+		return controller
+
+	# New controller would take objects from other controller or add to own keys
+	driven = {object for members in followers.values() for object in members & selected}
+	data_paths = {f'["{name}"]' for name in key_properties}
+	keyed = {object for object in selected - driven if has_keys(object, data_paths) or data_paths & state["keyed"].get(object, set())}
+	if driven or keyed:
+		raise ValueError(f"Controller not set: {len(driven)} objects follow another controller, "
+						 f"{len(keyed)} objects have own keys. Select the same objects or turn off Controller.")
+	if len(followers) >= CONTROLLER_SLOTS:
+		raise ValueError(f"Controller not set: all {CONTROLLER_SLOTS} controllers are used. Remove a controller or turn off Controller.")
+	# Placeholder for controller created by this step
+	followers[("new", len(followers))] = selected
+	return None
+
+def note_keys(state, objects, key_properties):
+	# Own keys of later steps detach objects from controller
+	for object in objects:
+		state["keyed"].setdefault(object, set()).update(f'["{name}"]' for name in key_properties)
+		for members in state["followers"].values():
+			members.discard(object)
+
+def link_controller(scene, controller):
+	# Scene properties of slot follow controller, same drivers for any number of followers
+	slot = controller[CONTROLLER_NAME]
+	for name in PROPERTY_NAMES:
+		value = controller[name]
+		target = controller_property(slot, name)
+		scene[target] = value.to_list() if hasattr(value, "to_list") else float(value)
+		add_driver(scene, target, controller, name)
+
+def add_driver(id, name, controller, source):
+	data_path = f'["{name}"]'
+	value = id[name]
+	size = len(value) if hasattr(value, "__len__") else 0
+	for index in range(max(size, 1)):
+		# Averaged single property is evaluated without Python
+		fcurve = id.driver_add(data_path, index) if size else id.driver_add(data_path)
+		driver = fcurve.driver
+		driver.type = 'AVERAGE'
+		variable = driver.variables[0] if driver.variables else driver.variables.new()
+		variable.type = 'SINGLE_PROP'
+		variable.targets[0].id_type = 'OBJECT'
+		variable.targets[0].id = controller
+		variable.targets[0].data_path = f'["{source}"][{index}]' if size else f'["{source}"]'
+
+# Visibility keys for fully transparent frame ranges
+HIDE_PATHS = ("hide_viewport", "hide_render")
+VISIBILITY_GROUP = "StepTools"
+
+def is_visibility_curve(fcurve):
+	# Only curves created by Auto Hide are in StepTools group
+	return fcurve.data_path in HIDE_PATHS and fcurve.group is not None and fcurve.group.name == VISIBILITY_GROUP
+
+def hidden_keys(fcurve):
+	co = np.empty(len(fcurve.keyframe_points) * 2, dtype=np.float32)
+	fcurve.keyframe_points.foreach_get("co", co)
+	frames = co[0::2]
+	full = co[1::2] >= 1.0 - 1e-4
+	if not full.any():
+		return frames[:0], full[:0]
+
+	# Range between two keys is hidden if both keys are fully transparent
+	hidden = np.append(full[:-1] & full[1:], full[-1])
+	if full[0] and not hidden[0]:
+		# Hidden before fade in (constant extrapolation)
+		frames = np.insert(frames, 0, frames[0] - 1)
+		hidden = np.insert(hidden, 0, True)
+
+	# Only frames where visibility changes
+	keep = np.ones(len(hidden), dtype=bool)
+	keep[1:] = hidden[1:] != hidden[:-1]
+	return frames[keep], hidden[keep]
+
+def write_visibility(object, frames, hidden):
+	# Own visibility animation is kept, object is skipped (returns False)
+	action = object.animation_data.action if object.animation_data else None
+	fcurves = {data_path: action.fcurves.find(data_path) if action else None for data_path in HIDE_PATHS}
+	if any(fcurve is not None and not is_visibility_curve(fcurve) for fcurve in fcurves.values()):
+		return False
+
+	for data_path, fcurve in fcurves.items():
+		if not hidden.any():
+			if fcurve is not None:
+				action.fcurves.remove(fcurve)
+				setattr(object, data_path, False)
+			continue
+
+		if fcurve is None:
+			fcurve = get_fcurve(object, data_path, group=VISIBILITY_GROUP)
+		points = fcurve.keyframe_points
+		points.clear()
+		points.add(len(frames))
+		co = np.empty(len(frames) * 2, dtype=np.float32)
+		co[0::2] = frames
+		co[1::2] = hidden
+		points.foreach_set("co", co)
+		points.foreach_set("interpolation", np.zeros(len(frames), dtype=np.int32)) # CONSTANT
+		fcurve.update()
+	return True
+
+# Rebuild visibility keys from transparency, followers of controller use its curve
+# Returns objects skipped because of own visibility animation
+def sync_visibility(objects):
+	followers = {}
+	if any(object.get(CONTROLLER_NAME) for object in objects):
+		followers = controller_followers()
+
+	skipped = []
+	for object in objects:
+		action = object.animation_data.action if object.animation_data else None
+		fcurve = action.fcurves.find('["StepTools_Transparent"]') if action else None
+		if fcurve is None:
+			continue
+		frames, hidden = hidden_keys(fcurve)
+		for target in followers.get(object, [object]):
+			if not write_visibility(target, frames, hidden):
+				skipped.append(target)
+	return skipped
+
+def visibility_warning(skipped):
+	return (f"Auto Hide skipped {len(skipped)} objects with own visibility animation "
+			f"({', '.join(object.name for object in skipped[:3])}{', ...' if len(skipped) > 3 else ''})")
+
+# Step patterns
+def step_pattern(property, pattern):
+	# Frame offsets and values in insertion order, length of pattern
+	if pattern == "color":
+		index = np.arange(property.count_blink * 2 + 1)
+		offsets = index * property.duration_blink
+		values = np.where(index % 2 == 0, 0.0, property.blend_blink)
+		return offsets, values, int(offsets[-1])
+
+	duration = property.duration_fade
+	blend = property.blend_transparent
+	if pattern == "blink":
+		index = np.arange(property.count_transparent_blink * 2 + 1)
+		offsets = index * duration
+		values = np.where(index % 2 == 0, 0.0, blend)
+		return offsets, values, int(offsets[-1])
+	elif pattern == "fade_in":
+		return np.array([0, duration]), np.array([blend, 0.0]), duration
+	elif pattern == "fade_out":
+		return np.array([0, duration]), np.array([0.0, blend]), duration
+	elif pattern == "fade_inout":
+		# Disappearance starts after the delay, last key set before the end key
+		delay = property.delay_length
+		offsets = np.array([0, 1, delay + 2, delay + 1]) * duration
+		return offsets, np.array([blend, 0.0, blend, 0.0]), (delay + 2) * duration
+
+def stagger_offsets(context, objects):
+	property = context.scene.property
+	offsets = np.zeros(len(objects), dtype=np.int64)
+	if property.stagger_order == "none" or not property.stagger_frames or not objects:
+		return offsets
+
+	if property.stagger_order == "name":
+		order = np.argsort([object.name for object in objects], kind="stable")
+	elif property.stagger_order == "cursor":
+		locations = np.array([object.matrix_world.translation for object in objects])
+		distance = np.linalg.norm(locations - np.array(context.scene.cursor.location), axis=1)
+		order = np.argsort(distance, kind="stable")
+	elif property.stagger_order == "selection":
+		# Objects missing in selection history go last
+		rank = {name: i for i, name in enumerate(selection_order)}
+		order = np.argsort([rank.get(object.name, len(rank)) for object in objects], kind="stable")
+
+	offsets[order] = np.arange(len(objects)) * property.stagger_frames
+	return offsets
+
+# Keyframes of recorded step
+def key_step(context, step, frame_start):
+	objects = step_objects(step)
+	offsets, values, length = step_pattern(step, step.step_type)
+	start = frame_start + np.array([item.offset for item in step.objects if item.object], dtype=np.int64)
+	frames = start[:, None] + offsets[None, :]
+	for object, object_frames in zip(objects, frames):
+		if step.step_type == "color":
+			insert_keyframes(context, object, "StepTools_Blink", object_frames, values)
+			if step.palette_index or has_fcurve(object, '["StepTools_Blink_Index"]'):
+				insert_keyframes(context, object, "StepTools_Blink_Index", object_frames[[0, -1]], [step.palette_index] * 2)
+			if not step.palette_index:
+				color = tuple(step.color_blink)
+				insert_keyframes(context, object, "StepTools_Blink_Color", object_frames[[0, -1]], [color] * 2)
+		else:
+			insert_keyframes(context, object, "StepTools_Transparent", object_frames, values)
+		if context.scene.property.defer_updates:
+			tag_update(object)
+	step.keyed_type = step.step_type
+	step.keyed_start = frame_start
+	step.keyed_end = int(start.max()) + length if len(start) else frame_start + length
+	return step.keyed_end
+
+def step_objects(step):
+	return [item.object for item in step.objects if item.object]
+
+def step_curves(objects, step_type=None):
+	# StepTools F-Curves of pattern (all StepTools curves without type)
+	if step_type is None:
+		data_paths = None
+	elif step_type == "color":
+		data_paths = {'["StepTools_Blink"]', '["StepTools_Blink_Color"]', '["StepTools_Blink_Index"]'}
+	else:
+		data_paths = {'["StepTools_Transparent"]'}
+
+	for object in objects:
+		action = object.animation_data.action if object.animation_data else None
+		if action is None:
+			continue
+		for fcurve in action.fcurves:
+			if fcurve.data_path in data_paths if data_paths else fcurve.data_path.startswith(DATA_PATH_PREFIX):
+				yield fcurve
+
+# Selection order for cascade
+selection_order = []
+
+@persistent
+def update_selection_order(scene, depsgraph):
+	if scene.property.stagger_order != "selection":
+		return
+	selected_objects = getattr(bpy.context, "selected_objects", None)
+	if selected_objects is None:
+		return
+	names = [object.name for object in selected_objects]
+	selected = set(names)
+	selection_order[:] = [name for name in selection_order if name in selected]
+	known = set(selection_order)
+	selection_order.extend(name for name in names if name not in known)
+
+# Inventory of StepTools data, computed by timer after changes (not in draw)
+FCURVE_COST = 0.3 # Microseconds per curve evaluation
+DRIVER_COST = 1.5
+OBJECT_COST = 2.0 # Object update after animated property change
+INVENTORY_DELAY = 1.0
+
+inventory = {}
+inventory_state = {"dirty": True, "wanted": False, "pending": False}
+
+def compute_inventory():
+	objects = [object for object in bpy.data.objects if any(name in object for name in PROPERTY_NAMES)]
+	materials = [material for material in bpy.data.materials if "StepTools_Injected" in material]
+	groups = [group for group in bpy.data.node_groups if GROUP_PATTERN.match(group.name)]
+	fcurves = [fcurve for action in bpy.data.actions for fcurve in action.fcurves
+			   if fcurve.data_path.startswith(DATA_PATH_PREFIX)]
+	drivers = sum(1 for id in [*objects, *bpy.data.scenes] if id.animation_data
+				  for fcurve in id.animation_data.drivers if fcurve.data_path.startswith(DATA_PATH_PREFIX))
+	animated = sum(1 for object in objects if object.animation_data and (object.animation_data.action or object.animation_data.drivers))
+	bypassed = sum(1 for material in materials if material.node_tree and
+				   getattr(material.node_tree.nodes.get(GROUP_NAME), "mute", False))
+	return {
+		"objects": len(objects),
+		"controllers": sum(1 for object in objects if object.get(CONTROLLER_NAME)),
+		"followers": sum(1 for object in objects if object.get(FOLLOW_NAME)),
+		"materials": len(materials),
+		"bypassed": bypassed,
+		"groups": len(groups),
+		"duplicates": max(len(groups) - 1, 0),
+		"curves": len(fcurves),
+		"keys": sum(len(fcurve.keyframe_points) for fcurve in fcurves),
+		"drivers": drivers,
+		"orphan_actions": sum(1 for action in bpy.data.actions if action.users == 0),
+		"markers": sum(1 for scene in bpy.data.scenes for marker in scene.timeline_markers
+					   if parse_pause_marker(marker.name) is not None),
+		"cost": len(fcurves) * FCURVE_COST + drivers * DRIVER_COST + animated * OBJECT_COST,
+	}
+
+def update_inventory():
+	inventory_state["pending"] = False
+	if inventory_state["wanted"] and inventory_state["dirty"]:
+		refresh_inventory()
+	return None
+
+def refresh_inventory():
+	inventory.clear()
+	inventory.update(compute_inventory())
+	inventory_state["dirty"] = False
+	# Set again by next draw, closed panel stops updates
+	inventory_state["wanted"] = False
+	if bpy.context.window_manager:
+		for window in bpy.context.window_manager.windows:
+			for area in window.screen.areas:
+				if area.type == "DOPESHEET_EDITOR":
+					area.tag_redraw()
+
+def request_inventory():
+	if not inventory_state["pending"]:
+		inventory_state["pending"] = True
+		bpy.app.timers.register(update_inventory, first_interval=INVENTORY_DELAY)
+
+@persistent
+def mark_inventory(*args):
+	inventory_state["dirty"] = True
+	if inventory_state["wanted"]:
+		request_inventory()
+
+# Only changes of StepTools data, not selection or transforms
+INVENTORY_TYPES = (bpy.types.Action, bpy.types.Material, bpy.types.NodeTree)
+
+@persistent
+def depsgraph_inventory(scene, depsgraph):
+	if any(isinstance(update.id, INVENTORY_TYPES) for update in depsgraph.updates):
+		mark_inventory()
+
+class StepToolsInventoryRefresh(Operator):
+	bl_idname = "action.steptools_inventory_refresh"
+	bl_label = "Refresh Inventory"
+	bl_description = "Count StepTools data of the file now"
+
+	def execute(self, context):
+		refresh_inventory()
+		return {'FINISHED'}
 
 # Blink
 class StepToolsMain(Operator):
@@ -159,131 +1188,174 @@ class StepToolsMain(Operator):
 	bl_options = {"REGISTER", "UNDO"}
 
 	def execute(self, context):
-		selected_objects = [obj for obj in bpy.context.selected_objects if obj.data is not None]
+		return self.prepare_objects(context)
+
+	def prepare_objects(self, context, objects=None):
+		self.timer = PhaseTimer()
+		self.keys = 0
+		self.compacted = 0
+		self.followers = []
+		with self.timer.phase("scan"):
+			self.scan_selection(context, objects)
 
-		# Get all materials
-		all_materials = []
-		for obj in selected_objects:
-			for mat in obj.material_slots:
-				all_materials.append(mat.name)
+		# Check materials group 
+		with self.timer.phase("inject"):
+			self.group = get_group()
+			for material in self.materials:
+				self.prepare_material(context, material)
+		
+		with self.timer.phase("parameters"):
+			for object in self.objects:
+				# Create custom properties
+				self.create_parameters(object)
+			
+				# Remove empty action and data
+				if object.animation_data and not object.animation_data.action:
+					object.animation_data.action = None
+					object.animation_data_clear()
+
+		# Remove empty actions
+		with self.timer.phase("cleanup"):
+			self.track_actions(self.objects)
+			self.remove_actions()
+		return {"FINISHED"}
 
-		materials = []
-		self.objects = []
+	def scan_selection(self, context, objects=None):
+		if objects is None:
+			objects = bpy.context.selected_objects
+		selected_objects = [obj for obj in objects if obj.data is not None]
+		instancers = [obj for obj in objects if obj.data is None and is_instancer(obj)]
+
+		# Count users of materials in selection
+		material_users = Counter(slot.material for obj in selected_objects for slot in obj.material_slots)
+
+		# Actions touched by this run, only these are cleaned up
+		self.actions = set()
+		self.track_actions(selected_objects + instancers)
+
+		# Ordered sets of materials and objects
+		materials = {}
+		objects = {}
+		self.copies = []
+		zero_copy = context.scene.property.zero_copy
+		self.avoided_copies = 0
+		self.avoided_size = 0
+		local_copies = {}
 		for object in selected_objects:
 			# Create single user object (if needed)
 			if context.scene.property.single_user_data and object.data.users > 1:
-				object.data = object.data.copy()
+				if zero_copy:
+					self.avoided_copies += 1
+					self.avoided_size += estimate_size(object.data)
+				else:
+					self.copies.append((object, None, object.data))
+					object.data = object.data.copy()
 			
-			for id, slot in enumerate(object.material_slots):
-				material = object.material_slots[id].material
-				if not material or not material and not material.use_nodes:
+			for index, slot in enumerate(object.material_slots):
+				material = slot.material
+				if not material or not material.use_nodes:
 					continue
-				else:
-					# Create single user material (if needed)
-					if context.scene.property.single_user_material and material.users > 1:
-						if material.users != all_materials.count(material.name):
-							material = material.copy()
-							if material.node_tree.animation_data and material.node_tree.animation_data.action:
-								material.node_tree.animation_data.action = material.node_tree.animation_data.action.copy()
-							object.material_slots[id].material = material
-
-					# Add material to list
-					if not material in materials:
-						materials.append(material)
-						
-					# Add object to list	
-					if not object in self.objects:
-						self.objects.append(object)
-		
-		# Check materials group 
-		for material in materials:
-			material_nodes = material.node_tree.nodes
-			links = material.node_tree.links
-
-			# Check OUTPUT_MATERIAL
-			material_output = [node for node in material_nodes if node.type == "OUTPUT_MATERIAL"]
-			if not material_output:
-				material_output = material_nodes.new("ShaderNodeOutputMaterial")
-
-			# Check available group
-			groups = [node for node in material_nodes if node.type == "GROUP"]
-			steptools_group = [group for group in groups if "StepTools" in group.node_tree.name]
-			if not steptools_group:
-				self.create_group(context, material_output[0], material_nodes, links)
-		
-		
-		for object in self.objects:
-			# Create custom properties
-			self.create_parameters(object)
-		
-			# Remove empty action and data
-			if object.animation_data and not object.animation_data.action:
-				object.animation_data.action = None
-				object.animation_data_clear()
 
-		# Remove empty actions
-		for action in bpy.data.actions:
-			if action.users == 0:
-				bpy.data.actions.remove(action)
-		return {"FINISHED"}
+				# Create single user material (if needed)
+				if context.scene.property.single_user_material and material.users > 1:
+					if material.users != material_users[material]:
+						if zero_copy:
+							self.avoided_copies += 1
+							self.avoided_size += estimate_size(material)
+						else:
+							material = self.copy_material(object, index, material)
+
+				# Linked material can't be edited, one local copy for all users
+				if zero_copy and (material.library or material.override_library):
+					if material not in local_copies:
+						local_copies[material] = material.copy()
+					self.copies.append((object, index, material))
+					material = local_copies[material]
+					slot.material = material
+
+				materials[material] = True
+				objects[object] = True
+
+		# Instance empty is keyed, materials of instanced objects stay shared
+		self.skipped_linked = 0
+		for object in instancers:
+			for child in instance_objects(object):
+				for slot in child.material_slots:
+					material = slot.material
+					if not material or not material.use_nodes:
+						continue
+					if material.library or material.override_library:
+						self.skipped_linked += 1
+						continue
+					materials[material] = True
+			objects[object] = True
+		self.materials = list(materials)
+		self.objects = list(objects)
+
+	def copy_material(self, object, index, material):
+		self.copies.append((object, index, material))
+		material = material.copy()
+		if material.node_tree.animation_data and material.node_tree.animation_data.action:
+			self.actions.add(material.node_tree.animation_data.action)
+			material.node_tree.animation_data.action = material.node_tree.animation_data.action.copy()
+			self.actions.add(material.node_tree.animation_data.action)
+		object.material_slots[index].material = material
+		return material
+
+	def copy_summary(self):
+		summary = ""
+		if self.avoided_copies:
+			summary += f"zero copy avoided {self.avoided_copies} copies (~{self.avoided_size / 1048576:.1f} MB), "
+		if self.skipped_linked:
+			summary += f"{self.skipped_linked} linked instanced materials skipped, "
+		return summary
+
+	def track_actions(self, ids):
+		for id in ids:
+			if id.animation_data and id.animation_data.action:
+				self.actions.add(id.animation_data.action)
+
+	def remove_actions(self):
+		orphans = [action for action in self.actions if action.users == 0]
+		bpy.data.batch_remove(orphans)
+		self.actions.clear()
+		return len(orphans)
+
+	def prepare_material(self, context, material):
+		material_nodes = material.node_tree.nodes
+
+		# Skip node scan for materials tagged on previous run
+		group_node = material_nodes.get(GROUP_NAME)
+		if material.get("StepTools_Injected") and group_node:
+			group_node.mute = False
+			# Group of older version or duplicate
+			if group_node.node_tree != self.group:
+				group_node.node_tree = self.group
+			return False
+
+		# Check OUTPUT_MATERIAL
+		material_output = next((node for node in material_nodes if node.type == "OUTPUT_MATERIAL"), None)
+		if material_output is None:
+			material_output = material_nodes.new("ShaderNodeOutputMaterial")
+
+		# Check available group
+		group_node = next((node for node in material_nodes if node.type == "GROUP" and node.node_tree
+						   and "StepTools" in node.node_tree.name), None)
+		if group_node is None:
+			self.create_group(context, material_output, material_nodes, material.node_tree.links)
+		else:
+			group_node.name = GROUP_NAME
+			group_node.node_tree = self.group
+		material["StepTools_Injected"] = True
+		return group_node is None
 
 	def create_group(self, context, material_output, material_nodes, links):
-		# Create input \ output nodes
-		group = bpy.data.node_groups.new("StepTools", "ShaderNodeTree")
-		group_input : bpy.types.ShaderNodeGroup = group.nodes.new("NodeGroupInput")
-		group_input.location = (0, 5)
-		group_output : bpy.types.ShaderNodeGroup = group.nodes.new("NodeGroupOutput")
-		group_output.location = (1200, 0)
-		
-		group.interface.new_socket(name="Shader", description="Shader Input", in_out ="INPUT", socket_type="NodeSocketShader")
-		group.interface.new_socket(name="Shader", description="Shader Output", in_out ="OUTPUT", socket_type="NodeSocketShader")
-		
-		# Nodes for blink
-		mix_shader_blink = group.nodes.new("ShaderNodeMixShader")
-		mix_shader_blink.location = (600,50)
-		mix_shader_blink_inputs = [input for input in mix_shader_blink.inputs if input.name == "Shader"]
-		
-		emission_shader = group.nodes.new("ShaderNodeEmission")
-		emission_shader.location = (300, -200)
-		
-		attr_blink = group.nodes.new(type='ShaderNodeAttribute')
-		attr_blink.location = (300, 300)
-		attr_blink.attribute_type = 'OBJECT'
-		attr_blink.attribute_name = '["StepTools_Blink"]'
-		
-		attr_blink_color = group.nodes.new(type='ShaderNodeAttribute')
-		attr_blink_color.location = (0, -130)
-		attr_blink_color.attribute_type = 'OBJECT'
-		attr_blink_color.attribute_name = '["StepTools_Blink_Color"]'
-		
-		# Nodes for transparency
-		mix_shader_transparent = group.nodes.new("ShaderNodeMixShader")
-		mix_shader_transparent.location = (900,50)
-		mix_shader_transparent_inputs = [input for input in mix_shader_transparent.inputs if input.name == "Shader"]
-		
-		transparent_shader = group.nodes.new("ShaderNodeBsdfTransparent")
-		transparent_shader.location = (600, -200)
-		transparent_shader.inputs["Color"].default_value = (1, 1, 1, 0)
-		
-		attr_transparent = group.nodes.new(type='ShaderNodeAttribute')
-		attr_transparent.location = (600, 300)
-		attr_transparent.attribute_type = 'OBJECT'
-		attr_transparent.attribute_name = '["StepTools_Transparent"]'
-		
-		# Create link
-		group.links.new(group_input.outputs["Shader"], mix_shader_blink_inputs[0])
-		group.links.new(attr_blink.outputs["Fac"], mix_shader_blink.inputs["Fac"])
-		group.links.new(attr_blink_color.outputs["Color"], emission_shader.inputs["Color"]) 
-		group.links.new(emission_shader.outputs["Emission"], mix_shader_blink_inputs[1])
-		
-		group.links.new(mix_shader_blink.outputs["Shader"], mix_shader_transparent_inputs[0])
-		group.links.new(attr_transparent.outputs["Fac"], mix_shader_transparent.inputs["Fac"])
-		group.links.new(transparent_shader.outputs["BSDF"], mix_shader_transparent_inputs[1])
-		group.links.new(mix_shader_transparent.outputs["Shader"], group_output.inputs["Shader"])
-		
+		group = get_group()
+
 		# Create group node
 		group_node = material_nodes.new("ShaderNodeGroup")
 		group_node.node_tree = group
+		group_node.name = GROUP_NAME
 		group_node.location = material_output.location
 		material_output.location.x = material_output.location.x + 250
 		
@@ -294,8 +1366,152 @@ class StepToolsMain(Operator):
 			links.new(group_node.outputs["Shader"], material_output.inputs["Surface"])
 		return {"FINISHED"}
 	
-	# Property for custome object property
+	# Set pattern keyframes for all objects in one pass
+	def key_pattern(self, context, name, pattern, index=slice(None)):
+		offsets, values, length = step_pattern(context.scene.property, pattern)
+		frames = self.start[index, None] + offsets[None, :]
+		for object, object_frames in zip(self.objects[index], frames):
+			# Own keys replace controller
+			if FOLLOW_NAME in object:
+				del object[FOLLOW_NAME]
+			self.keys += insert_keyframes(context, object, name, object_frames, values)
+
+		self.curent_frame = int(self.start.max()) + length if len(self.start) else context.scene.frame_current + length
+		return frames
+
+	# Start frame of each object
+	def start_frames(self, context):
+		self.frame_start = context.scene.frame_current
+		self.start = self.frame_start + stagger_offsets(context, self.objects)
+
+	# Pattern of keying run
+	def pattern_name(self, context):
+		if context.scene.property.step_type == "color":
+			return "color"
+		return context.scene.property.transparent_type
+
+	def record_step(self, context):
+		property = context.scene.property
+		step = property.steps.add()
+		step.step_type = self.pattern_name(context)
+		step.name = f"{step.bl_rna.properties['step_type'].enum_items[step.step_type].name} {len(property.steps)}"
+		for name in STEP_PARAMETERS:
+			setattr(step, name, getattr(property, name))
+		step.palette_index = self.palette_index(context) if step.step_type == "color" else 0
+		step.frame_start = step.keyed_start = self.frame_start
+		step.keyed_type = step.step_type
+		step.keyed_end = self.curent_frame
+		for object, start in zip(self.objects, self.start.tolist()):
+			item = step.objects.add()
+			item.object = object
+			item.offset = start - self.frame_start
+		property.step_index = len(property.steps) - 1
+
+	# Optional visibility keys after transparency keying
+	def update_visibility(self, context):
+		if context.scene.property.auto_hide and self.pattern_name(context) != "color":
+			with self.timer.phase("visibility"):
+				skipped = sync_visibility(self.objects)
+			if skipped:
+				self.report({'WARNING'}, visibility_warning(skipped))
+
+	# Optional compaction of keyed curves
+	def compact_objects(self, context):
+		if context.scene.property.compact_keys:
+			with self.timer.phase("compact"):
+				self.compacted += compact_curves(step_curves(self.objects))
+
+	def compact_summary(self):
+		return f" ({self.compacted} compacted)" if self.compacted else ""
+
+	# Tag each keyed object once (deferred updates)
+	def tag_objects(self, context):
+		if context.scene.property.defer_updates:
+			for object in self.objects:
+				tag_update(object)
+
+	# Prepare, key and move cursor with timings and report
+	def run_step(self, context, set_keyframes):
+		with profile_run(context) as profile, UpdateCounter() as counter:
+			# Controller is checked before the file is changed
+			controller = None
+			if context.scene.property.use_controller:
+				try:
+					objects = keyable_objects(bpy.context.selected_objects)
+					controller = plan_controller(objects, self.key_properties, controller_state()) if objects else None
+				except ValueError as error:
+					self.report({'ERROR'}, str(error))
+					return {'CANCELLED'}
+
+			StepToolsMain.execute(self, context)
+			if context.scene.property.use_controller and self.objects:
+				with self.timer.phase("controller"):
+					self.set_controller(context, controller)
+			with self.timer.phase("keys"):
+				self.start_frames(context)
+				set_keyframes(context)
+			self.compact_objects(context)
+			self.update_visibility(context)
+			with self.timer.phase("cursor"):
+				self.tag_objects(context)
+				StepToolsCursor.execute(self, context)
+			if context.scene.property.record_steps and self.objects:
+				self.record_step(context)
+
+		summary = (f"{self.copy_summary()}{len(self.objects)} objects, {len(self.materials)} materials, {self.keys} keys{self.compact_summary()} | "
+				   f"{self.timer.summary()} | {counter.summary()}")
+		if self.followers:
+			summary = f"{len(self.followers)} objects follow {self.objects[0].name}, " + summary
+		if profile["path"]:
+			summary += f" | profile saved: {profile['path']}"
+		self.report({'INFO'}, summary)
+		if context.scene.property.log_timings:
+			write_log(f"{self.bl_idname}: {summary}")
+		watch_depsgraph(context, self.bl_idname)
+		return {"FINISHED"}
+
+	# Key one controller (checked by plan_controller), selected objects follow it in the shader
+	def set_controller(self, context, controller):
+		if controller is None:
+			used = {object[CONTROLLER_NAME] for object in bpy.data.objects if object.get(CONTROLLER_NAME)}
+			slot = next(slot for slot in range(1, CONTROLLER_SLOTS + 1) if slot not in used)
+
+			# Objects left on slot of a deleted controller
+			for object in bpy.data.objects:
+				if object.get(FOLLOW_NAME) == slot:
+					del object[FOLLOW_NAME]
+					tag_update(object)
+
+			controller = bpy.data.objects.new(CONTROLLER_NAME, None)
+			controller.empty_display_size = 0.25
+			controller.hide_render = True
+			controller[CONTROLLER_NAME] = slot
+			context.scene.collection.objects.link(controller)
+			self.create_parameters(controller)
+		link_controller(context.scene, controller)
+
+		for object in self.objects:
+			if object.get(FOLLOW_NAME) != controller[CONTROLLER_NAME]:
+				object[FOLLOW_NAME] = controller[CONTROLLER_NAME]
+				tag_update(object)
+		self.followers = self.objects
+		self.objects = [controller]
+
+	# Palette index of blink color (0: own color)
+	def palette_index(self, context):
+		property = context.scene.property
+		if not property.use_palette or not property.palette:
+			return 0
+		return min(max(property.palette_active, 0), len(property.palette) - 1) + 1
+
+	# Property for custome object property (created once, values are keyed)
 	def create_parameters(self, object):
+		if "StepTools_Blink_Index" not in object:
+			object["StepTools_Blink_Index"] = 0
+			object.id_properties_ui("StepTools_Blink_Index").update(min=0, max=PALETTE_SIZE, default=0)
+		if all(name in object for name in ("StepTools_Blink", "StepTools_Blink_Color", "StepTools_Transparent")):
+			return {"FINISHED"}
+
 		object["StepTools_Blink"] = 0.0
 		object.id_properties_ui("StepTools_Blink").update(
 			min=0.0,
@@ -329,69 +1545,236 @@ class StepToolsBlink(StepToolsMain):
 	bl_label = "Set Keyframes Blink"
 	bl_description = "Set keyframes for blink"
 	bl_options = {"REGISTER", "UNDO"}
+	key_properties = ("StepTools_Blink", "StepTools_Blink_Color", "StepTools_Blink_Index")
 
 	def execute(self, context):
-		StepToolsMain.execute(self, context)
-
-		self.curent_frame = bpy.context.scene.frame_current
-		for object in self.objects:
-			object["StepTools_Blink"] = 0.0
-			object["StepTools_Blink_Color"] = context.scene.property.color_blink
-			
-			for i in range(context.scene.property.count_blink * 2 + 1):
-				value = 0.0 if i % 2 == 0 else context.scene.property.blend_blink
-				frame = bpy.context.scene.frame_current + i * context.scene.property.duration_blink
-				self.curent_frame = frame
-				object["StepTools_Blink"] = value
-				object.update_tag()
-				object.keyframe_insert(data_path='["StepTools_Blink"]', frame = frame)
-				
-				# Set keyframes for color
-				if i == 0 or i == context.scene.property.count_blink * 2:
-					object["StepTools_Blink_Color"] = context.scene.property.color_blink
-					object.update_tag()
-					object.keyframe_insert(data_path='["StepTools_Blink_Color"]', frame=frame)
-		StepToolsCursor.execute(self, context)
-		return {"FINISHED"}
+		return self.run_step(context, self.set_keyframes)
+
+	def pattern_name(self, context):
+		return "color"
+
+	def set_keyframes(self, context, index=slice(None)):
+		frames = self.key_pattern(context, "StepTools_Blink", "color", index)
+
+		# Set keyframes for color on first and last frame
+		color = tuple(context.scene.property.color_blink)
+		palette_index = self.palette_index(context)
+		for object, color_frames in zip(self.objects[index], frames[:, [0, -1]]):
+			# Index 0 is keyed only over earlier palette keys
+			if palette_index or has_fcurve(object, '["StepTools_Blink_Index"]'):
+				object["StepTools_Blink_Index"] = palette_index
+				self.keys += insert_keyframes(context, object, "StepTools_Blink_Index", color_frames, [palette_index] * 2)
+			if not palette_index:
+				object["StepTools_Blink_Color"] = color
+				self.keys += insert_keyframes(context, object, "StepTools_Blink_Color", color_frames, [color] * 2)
 
 class StepToolsTransparent(StepToolsMain):
 	bl_idname = "action.steptools_transparent"
 	bl_label = "Set Keyframes Transparent"
 	bl_description = "Set keyframes for transparency"
 	bl_options = {"REGISTER", "UNDO"}
+	key_properties = ("StepTools_Transparent",)
 	
 	def execute(self, context):
-		StepToolsMain.execute(self, context)
-		self.curent_frame = bpy.context.scene.frame_current
-		for object in self.objects:
-			if context.scene.property.transparent_type == "blink":
-				count_transparent_blink = context.scene.property.count_transparent_blink * 2 + 1
-				range_data = (count_transparent_blink, 0.0, context.scene.property.blend_transparent)
-			elif context.scene.property.transparent_type == "fade_in":
-				range_data = (2, context.scene.property.blend_transparent, 0.0)
-			elif context.scene.property.transparent_type == "fade_out":
-				range_data = (2, 0.0, context.scene.property.blend_transparent)
-			elif context.scene.property.transparent_type == "fade_inout":
-				range_data = (4, context.scene.property.blend_transparent, 0.0)
-
-			for i in range(range_data[0]):
-				value = range_data[1] if i % 2 == 0 else range_data[2]
-				frame = bpy.context.scene.frame_current + i * context.scene.property.duration_fade
-				self.curent_frame = frame
-				
-				# Set keyframes for transparency
-				if context.scene.property.transparent_type == "fade_inout":
-					if i == 2:
-						frame += context.scene.property.duration_fade * context.scene.property.delay_length
-					elif i == 3:
-						frame += context.scene.property.duration_fade * (context.scene.property.delay_length - 2)
-						self.curent_frame = frame + context.scene.property.duration_fade
-
-				object["StepTools_Transparent"] = value
-				object.update_tag()
-				object.keyframe_insert(data_path='["StepTools_Transparent"]', frame = frame)
-		StepToolsCursor.execute(self, context)
-		return {"FINISHED"}
+		return self.run_step(context, self.set_keyframes)
+
+	def pattern_name(self, context):
+		return context.scene.property.transparent_type
+
+	def set_keyframes(self, context, index=slice(None)):
+		self.key_pattern(context, "StepTools_Transparent", context.scene.property.transparent_type, index)
+
+NAVIGATION_EVENTS = {'MOUSEMOVE', 'INBETWEEN_MOUSEMOVE', 'WHEELUPMOUSE', 'WHEELDOWNMOUSE', 'MIDDLEMOUSE',
+					 'TRACKPADPAN', 'TRACKPADZOOM', 'MOUSEROTATE', 'WINDOW_DEACTIVATE'}
+
+class StepToolsModal(StepToolsMain):
+	bl_idname = "action.steptools_modal"
+	bl_label = "Set Keyframes in Chunks"
+	bl_description = "Set keyframes in chunks with progress, press ESC to cancel (without controller)"
+	bl_options = {"REGISTER", "UNDO"}
+
+	chunk_size: IntProperty(
+		name="Chunk Size",
+		description="Objects or materials processed per step",
+		default = 250,
+		min = 1
+	)
+
+	def invoke(self, context, event):
+		if not self.prepare(context):
+			return {'CANCELLED'}
+		self.event_timer = context.window_manager.event_timer_add(0.01, window=context.window)
+		context.window_manager.modal_handler_add(self)
+		context.window_manager.progress_begin(0, self.total)
+		return {'RUNNING_MODAL'}
+
+	def execute(self, context):
+		# Without UI process all chunks at once
+		if not self.prepare(context):
+			return {'CANCELLED'}
+		self.event_timer = None
+		while self.queue:
+			self.process_chunk(context)
+		return self.complete(context)
+
+	def modal(self, context, event):
+		if event.type == 'ESC':
+			self.rollback(context)
+			self.finish(context)
+			self.report({'WARNING'}, "StepTools cancelled, changes reverted.")
+			return {'CANCELLED'}
+		if event.type != 'TIMER':
+			# Only view navigation, undo, delete or file loading would free held data
+			if event.type in NAVIGATION_EVENTS:
+				return {'PASS_THROUGH'}
+			return {'RUNNING_MODAL'}
+		if not self.references_valid():
+			self.finish(context)
+			self.report({'ERROR'}, "StepTools stopped, objects or materials were removed.")
+			return {'CANCELLED'}
+
+		self.process_chunk(context)
+		if not self.queue:
+			return self.complete(context)
+
+		phase = self.queue[0][0]
+		context.window_manager.progress_update(self.done)
+		context.workspace.status_text_set(f"StepTools: {phase} {self.done}/{self.total} (ESC to cancel)")
+		return {'RUNNING_MODAL'}
+
+	def references_valid(self):
+		try:
+			for id in (*self.objects, *self.materials):
+				id.name
+		except ReferenceError:
+			return False
+		return True
+
+	def prepare(self, context):
+		self.timer = PhaseTimer()
+		self.keys = 0
+		self.compacted = 0
+		with self.timer.phase("scan"):
+			self.scan_selection(context)
+			self.group = get_group()
+		if not self.objects:
+			self.report({'WARNING'}, "No objects with materials selected.")
+			return False
+		self.start_frames(context)
+
+		# Phases processed in chunks
+		self.queue = [("inject", len(self.materials)), ("parameters", len(self.objects)), ("keys", len(self.objects))]
+		self.queue = [(phase, count) for phase, count in self.queue if count]
+		self.total = sum(count for phase, count in self.queue)
+		self.position = 0
+		self.done = 0
+		self.injected = []
+		self.journal = []
+		return True
+
+	def process_chunk(self, context):
+		phase, count = self.queue[0]
+		index = slice(self.position, min(self.position + self.chunk_size, count))
+		with self.timer.phase(phase):
+			if phase == "inject":
+				for material in self.materials[index]:
+					if self.prepare_material(context, material):
+						self.injected.append(material)
+			elif phase == "parameters":
+				for object in self.objects[index]:
+					self.journal.append(self.snapshot_object(object))
+					self.create_parameters(object)
+					if object.animation_data and not object.animation_data.action:
+						object.animation_data_clear()
+			elif context.scene.property.step_type == "color":
+				StepToolsBlink.set_keyframes(self, context, index)
+			else:
+				StepToolsTransparent.set_keyframes(self, context, index)
+
+		self.done += index.stop - index.start
+		self.position = index.stop
+		if self.position >= count:
+			self.queue.pop(0)
+			self.position = 0
+
+	def complete(self, context):
+		self.compact_objects(context)
+		self.update_visibility(context)
+		with self.timer.phase("cleanup"):
+			self.track_actions(self.objects)
+			self.remove_actions()
+		with self.timer.phase("cursor"):
+			self.tag_objects(context)
+			StepToolsCursor.execute(self, context)
+		if context.scene.property.record_steps:
+			self.record_step(context)
+		self.finish(context)
+
+		summary = f"{self.copy_summary()}{len(self.objects)} objects, {len(self.materials)} materials, {self.keys} keys{self.compact_summary()} | {self.timer.summary()}"
+		self.report({'INFO'}, summary)
+		if context.scene.property.log_timings:
+			write_log(f"{self.bl_idname}: {summary}")
+		watch_depsgraph(context, self.bl_idname)
+		return {'FINISHED'}
+
+	def finish(self, context):
+		if self.event_timer is not None:
+			context.window_manager.event_timer_remove(self.event_timer)
+			context.window_manager.progress_end()
+			context.workspace.status_text_set(None)
+
+	# State of object before changes
+	def snapshot_object(self, object):
+		properties = {}
+		for name in (*PROPERTY_NAMES, FOLLOW_NAME):
+			if name in object:
+				value = object[name]
+				properties[name] = value.to_list() if hasattr(value, "to_list") else value
+
+		action = object.animation_data.action if object.animation_data else None
+		curves = {}
+		if action is not None:
+			for fcurve in action.fcurves:
+				if fcurve.data_path.startswith(DATA_PATH_PREFIX):
+					curves[(fcurve.data_path, fcurve.array_index)] = read_keyframes(fcurve)
+		return object, properties, action, curves
+
+	def rollback(self, context):
+		for object, properties, action, curves in reversed(self.journal):
+			for name in (*PROPERTY_NAMES, FOLLOW_NAME):
+				if name in properties:
+					object[name] = properties[name]
+				elif name in object:
+					del object[name]
+
+			# Restore action and StepTools curves
+			current = object.animation_data.action if object.animation_data else None
+			if current is not None and current != action:
+				self.actions.add(current)
+				object.animation_data.action = action
+			if action is not None:
+				for fcurve in list(action.fcurves):
+					if fcurve.data_path.startswith(DATA_PATH_PREFIX):
+						data = curves.get((fcurve.data_path, fcurve.array_index))
+						if data is None:
+							action.fcurves.remove(fcurve)
+						else:
+							restore_keyframes(fcurve, data)
+			object.update_tag()
+
+		for material in self.injected:
+			eject_group(material)
+
+		# Restore single user copies
+		for object, index, original in reversed(self.copies):
+			if index is None:
+				copy, object.data = object.data, original
+			else:
+				copy = object.material_slots[index].material
+				object.material_slots[index].material = original
+			if copy.users == 0:
+				bpy.data.batch_remove([copy])
+		self.remove_actions()
 
 class StepToolsCursor(Operator):
 	bl_idname = "action.steptools_cursor"
@@ -400,7 +1783,11 @@ class StepToolsCursor(Operator):
 	
 	def execute(self, context):
 		if self.objects and context.scene.property.move_cursor:
-			context.scene.frame_set(self.curent_frame)
+			if context.scene.property.defer_updates:
+				# Scene is evaluated on next redraw
+				context.scene.frame_current = self.curent_frame
+			else:
+				set_frame(context.scene, self.curent_frame)
 			if context.scene.property.set_marker:
 				StepToolsMarker.execute(self, context)
 		return {'FINISHED'}
@@ -435,6 +1822,580 @@ class StepToolsFadeInOut(StepToolsTransparent):
 		StepToolsTransparent.execute(self, context)
 		return {'FINISHED'}
 
+# Batch of steps
+STEP_ACTIONS = ("blink", "transparent", "fade_in", "fade_out", "fade_inout", "marker")
+step_results = []
+
+def apply_steps(steps, settings=None):
+	"""Apply a sequence of StepTools steps as one operator call and one undo step.
+
+	Each step is a dict:
+	    "action":      "blink", "transparent", "fade_in", "fade_out", "fade_inout" or "marker"
+	    "objects":     objects, object names or name patterns of view layer objects (e.g. "Bolt*")
+	    "collections": collection names, all objects of collections are added
+	    "frame":       start frame (default: current frame, moved by previous step)
+	    "params":      StepTools scene properties for this step, e.g. {"count_blink": 3}
+	    "marker":      set 'P' marker on start frame
+
+	"settings" are StepTools scene properties set before the first step, as in a script file.
+	Steps are checked before the file is changed, an invalid script applies nothing.
+	Objects of all steps are prepared once, the whole batch is a single undo step.
+	Returns a list with action, objects, keys and seconds of every step.
+
+	    import step_tools
+	    step_tools.apply_steps([
+	        {"action": "blink", "objects": ["Bolt"], "frame": 1},
+	        {"action": "fade_in", "collections": ["Cover"], "marker": True},
+	    ])
+	"""
+	# Objects are passed by name (escaped, names are patterns)
+	steps = [dict(step, objects=[glob.escape(object.name) if isinstance(object, bpy.types.ID) else object
+								 for object in step.get("objects", [])]) if isinstance(step, dict) else step
+			 for step in steps]
+	step_results.clear()
+	bpy.ops.action.steptools_apply_steps(steps=json.dumps(steps), settings=json.dumps(settings or {}))
+	return list(step_results)
+
+def load_script(filepath):
+	if filepath.endswith(".toml"):
+		import tomllib
+		with open(filepath, "rb") as f:
+			return tomllib.load(f)
+	with open(filepath, encoding="utf-8") as f:
+		return json.load(f)
+
+# Script is checked before the file is changed
+SETTING_TYPES = {"BOOLEAN", "INT", "FLOAT", "ENUM", "STRING"}
+
+def check_script(property, script):
+	if not isinstance(script, dict):
+		raise ValueError("Script must be an object with 'steps' and optional 'settings'")
+	settings = script.get("settings", {})
+	steps = script.get("steps", [])
+	if not isinstance(settings, dict):
+		raise ValueError("'settings' must be an object")
+	for name, value in settings.items():
+		check_setting(property, name, value, "settings")
+	if not isinstance(steps, list):
+		raise ValueError("'steps' must be a list")
+
+	for index, step in enumerate(steps):
+		where = f"step {index + 1}"
+		if not isinstance(step, dict):
+			raise ValueError(f"{where}: must be an object")
+		if step.get("action") not in STEP_ACTIONS:
+			raise ValueError(f"{where}: unknown action '{step.get('action')}'")
+		for key in ("objects", "collections"):
+			names = step.get(key, [])
+			if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+				raise ValueError(f"{where}: '{key}' must be a list of names")
+		if "frame" in step and (isinstance(step["frame"], bool) or not isinstance(step["frame"], int)):
+			raise ValueError(f"{where}: 'frame' must be an integer")
+		params = step.get("params", {})
+		if not isinstance(params, dict):
+			raise ValueError(f"{where}: 'params' must be an object")
+		for name, value in params.items():
+			check_setting(property, name, value, where)
+	return steps, settings
+
+def check_setting(property, name, value, where):
+	rna = property.bl_rna.properties.get(name)
+	if rna is None or rna.is_readonly or rna.type not in SETTING_TYPES:
+		raise ValueError(f"{where}: unknown setting '{name}'")
+	size = getattr(rna, "array_length", 0)
+	if size and (not isinstance(value, list) or len(value) != size):
+		raise ValueError(f"{where}: '{name}' needs a list of {size} values")
+
+	for item in value if size else [value]:
+		if rna.type == "BOOLEAN":
+			valid = isinstance(item, bool)
+		elif rna.type == "INT":
+			valid = isinstance(item, int) and not isinstance(item, bool)
+		elif rna.type == "FLOAT":
+			valid = isinstance(item, (int, float)) and not isinstance(item, bool)
+		elif rna.type == "ENUM":
+			valid = isinstance(item, str) and (not rna.enum_items or item in rna.enum_items.keys())
+		else:
+			valid = isinstance(item, str)
+		if not valid:
+			raise ValueError(f"{where}: invalid value {item!r} for '{name}'")
+
+# Objects by name pattern and collections, in given order
+def script_objects(context, step):
+	objects = []
+	for pattern in step.get("objects", []):
+		if glob.has_magic(pattern):
+			objects.extend(object for object in context.view_layer.objects if fnmatchcase(object.name, pattern))
+			continue
+		object = bpy.data.objects.get(pattern)
+		if object is None:
+			raise ValueError(f"Object '{pattern}' not found")
+		objects.append(object)
+	for name in step.get("collections", []):
+		collection = bpy.data.collections.get(name)
+		if collection is None:
+			raise ValueError(f"Collection '{name}' not found")
+		objects.extend(collection.all_objects)
+	return list(dict.fromkeys(objects))
+
+class StepToolsApplySteps(StepToolsMain):
+	bl_idname = "action.steptools_apply_steps"
+	bl_label = "Apply Steps"
+	bl_description = "Apply steps from .json or .toml script as one undo step"
+	bl_options = {"REGISTER", "UNDO"}
+
+	filepath: StringProperty(subtype="FILE_PATH")
+	filter_glob: StringProperty(default="*.json;*.toml", options={"HIDDEN"})
+	steps: StringProperty(description="Steps as JSON list (instead of file)", options={"HIDDEN", "SKIP_SAVE"})
+	settings: StringProperty(description="Settings as JSON object (with steps)", options={"HIDDEN", "SKIP_SAVE"})
+
+	def execute(self, context):
+		step_results.clear()
+		if not self.steps and not self.filepath:
+			self.report({'WARNING'}, "No steps to apply")
+			return {'CANCELLED'}
+
+		# Read and check all steps before the file is changed
+		property = context.scene.property
+		try:
+			if self.steps:
+				script = {"steps": json.loads(self.steps), "settings": json.loads(self.settings or "{}")}
+			else:
+				script = load_script(bpy.path.abspath(self.filepath))
+			steps, settings = check_script(property, script)
+			resolved = [(step, script_objects(context, step)) for step in steps]
+			self.plan_controllers(property, settings, resolved)
+		except (OSError, ValueError) as error:
+			self.report({'ERROR'}, f"Can't apply steps: {error}")
+			return {'CANCELLED'}
+
+		for name, value in settings.items():
+			setattr(property, name, value)
+
+		with profile_run(context) as profile, UpdateCounter() as counter:
+			# Scan and inject once for objects of all steps
+			union = list(dict.fromkeys(object for _step, objects in resolved for object in objects))
+			self.prepare_objects(context, union)
+			prepared = list(self.objects)
+			keyable = set(prepared)
+			for index, (step, objects) in enumerate(resolved):
+				start = time.perf_counter()
+				keys = self.keys
+				# Only objects with prepared materials get keys
+				self.objects = [object for object in objects if object in keyable]
+				self.apply_step(context, step)
+				step_results.append({
+					"index": index,
+					"action": step["action"],
+					"objects": len(objects),
+					"keys": self.keys - keys,
+					"seconds": round(time.perf_counter() - start, 4),
+				})
+			self.objects = prepared
+			with self.timer.phase("cleanup"):
+				self.track_actions(self.objects)
+				self.remove_actions()
+
+		summary = (f"{len(steps)} steps, {self.copy_summary()}{len(prepared)} objects, {len(self.materials)} materials, "
+				   f"{self.keys} keys{self.compact_summary()} | {self.timer.summary()} | {counter.summary()}")
+		if profile["path"]:
+			summary += f" | profile saved: {profile['path']}"
+		self.report({'INFO'}, summary)
+		if context.scene.property.log_timings:
+			write_log(f"{self.bl_idname}: {summary}")
+		watch_depsgraph(context, self.bl_idname)
+		return {"FINISHED"}
+
+	def invoke(self, context, event):
+		if self.steps:
+			return self.execute(context)
+		context.window_manager.fileselect_add(self)
+		return {'RUNNING_MODAL'}
+
+	# Controllers of all steps, as steps change them one after another
+	def plan_controllers(self, property, settings, resolved):
+		state = controller_state()
+		for step, objects in resolved:
+			objects = keyable_objects(objects)
+			if step["action"] == "marker" or not objects:
+				continue
+			key_properties = (StepToolsBlink if step["action"] == "blink" else StepToolsTransparent).key_properties
+			if step.get("params", {}).get("use_controller", settings.get("use_controller", property.use_controller)):
+				plan_controller(objects, key_properties, state)
+			else:
+				note_keys(state, objects, key_properties)
+
+	def pattern_name(self, context):
+		return self.step_pattern
+
+	def apply_step(self, context, step):
+		property = context.scene.property
+		params = step.get("params", {})
+		original = {name: getattr(property, name) for name in params}
+		if "color_blink" in original:
+			original["color_blink"] = tuple(original["color_blink"])
+		try:
+			for name, value in params.items():
+				setattr(property, name, value)
+			if "frame" in step:
+				context.scene.frame_current = step["frame"]
+			if step.get("marker") or step["action"] == "marker":
+				StepToolsMarker.execute(self, context)
+			if step["action"] == "marker" or not self.objects:
+				return
+
+			if step["action"] == "blink":
+				self.step_pattern = "color"
+				self.key_properties = StepToolsBlink.key_properties
+				set_keyframes = StepToolsBlink.set_keyframes
+			else:
+				if step["action"] != "transparent":
+					property.transparent_type = step["action"]
+				self.step_pattern = property.transparent_type
+				self.key_properties = StepToolsTransparent.key_properties
+				set_keyframes = StepToolsTransparent.set_keyframes
+
+			if property.use_controller:
+				with self.timer.phase("controller"):
+					# Checked by plan_controllers before the first step
+					try:
+						controller = plan_controller(self.objects, self.key_properties, controller_state())
+					except ValueError as error:
+						self.report({'ERROR'}, str(error))
+						return
+					self.set_controller(context, controller)
+			with self.timer.phase("keys"):
+				self.start_frames(context)
+				set_keyframes(self, context)
+			self.compact_objects(context)
+			self.update_visibility(context)
+			with self.timer.phase("cursor"):
+				self.tag_objects(context)
+				StepToolsCursor.execute(self, context)
+			if property.record_steps:
+				self.record_step(context)
+		finally:
+			for name, value in original.items():
+				setattr(property, name, value)
+
+# Blink palette
+class StepToolsPaletteAdd(Operator):
+	bl_idname = "action.steptools_palette_add"
+	bl_label = "Add Palette Color"
+	bl_description = "Add blink color to palette"
+	bl_options = {"REGISTER", "UNDO"}
+
+	def execute(self, context):
+		property = context.scene.property
+		if len(property.palette) >= PALETTE_SIZE:
+			self.report({'WARNING'}, f"Palette has {PALETTE_SIZE} colors")
+			return {'CANCELLED'}
+		item = property.palette.add()
+		item.name = f"Color {len(property.palette)}"
+		item.color = tuple(property.color_blink)[:3]
+		property.palette_active = len(property.palette) - 1
+		sync_palette(context.scene)
+		return {'FINISHED'}
+
+class StepToolsPaletteRemove(Operator):
+	bl_idname = "action.steptools_palette_remove"
+	bl_label = "Remove Palette Color"
+	bl_description = "Remove last palette color (keyed indexes of later colors would change)"
+	bl_options = {"REGISTER", "UNDO"}
+
+	def execute(self, context):
+		property = context.scene.property
+		if property.palette:
+			property.palette.remove(len(property.palette) - 1)
+			property.palette_active = min(property.palette_active, len(property.palette) - 1)
+			sync_palette(context.scene)
+		return {'FINISHED'}
+
+# Step list
+class StepToolsStepUpdate(Operator):
+	bl_idname = "action.steptools_step_update"
+	bl_label = "Update Step"
+	bl_description = "Regenerate keyframes of the step and shift later steps and markers"
+	bl_options = {"REGISTER", "UNDO"}
+
+	index: IntProperty(default=-1)
+
+	def execute(self, context):
+		property = context.scene.property
+		index = property.step_index if self.index < 0 else self.index
+		if not 0 <= index < len(property.steps):
+			return {'CANCELLED'}
+		step = property.steps[index]
+		old_start = step.keyed_start
+		old_end = step.keyed_end
+
+		# Remove old keyframes of step, earlier steps ending on its start are keyed again
+		earlier = [other for other in property.steps if other != step and other.keyed_end == old_start
+				   and (other.keyed_type == "color") == (step.keyed_type == "color")]
+		removed = sum(remove_keyframes(fcurve, old_start, old_end) for fcurve in step_curves(step_objects(step), step.keyed_type))
+
+		# New end of step (without keying yet)
+		offsets, values, length = step_pattern(step, step.step_type)
+		new_end = step.frame_start + max((item.offset for item in step.objects), default=0) + length
+		delta = new_end - old_end
+
+		# Shift later steps, their keyframes and markers
+		later = [other for other in property.steps if other != step and other.keyed_start >= old_end]
+		boundary = [other for other in later if other.keyed_start == old_end]
+		shifted = 0
+		if delta:
+			objects = {object for other in later for object in step_objects(other)}
+			for fcurve in step_curves(objects):
+				shifted += shift_keyframes(fcurve, old_end, delta)
+			for other in later:
+				other.frame_start += delta
+				other.keyed_start += delta
+				other.keyed_end += delta
+			for marker in context.scene.timeline_markers:
+				if marker.frame >= old_end:
+					marker.frame += delta
+
+		# Shared first key holds value of this step (as when recorded)
+		for other in earlier:
+			key_step(context, other, other.keyed_start)
+		key_step(context, step, step.frame_start)
+
+		# Steps starting on the old end share keys with this step
+		for other in boundary:
+			key_step(context, other, other.keyed_start)
+		if property.auto_hide:
+			skipped = sync_visibility({object for other in [*earlier, step, *later] for object in step_objects(other)})
+			if skipped:
+				self.report({'WARNING'}, visibility_warning(skipped))
+		self.report({'INFO'}, f"Removed {removed} keys, shifted {shifted} keys by {delta} frames.")
+		return {'FINISHED'}
+
+class StepToolsStepRemove(Operator):
+	bl_idname = "action.steptools_step_remove"
+	bl_label = "Remove Step"
+	bl_description = "Remove step from list (keyframes are kept)"
+	bl_options = {"REGISTER", "UNDO"}
+
+	def execute(self, context):
+		property = context.scene.property
+		if 0 <= property.step_index < len(property.steps):
+			property.steps.remove(property.step_index)
+			property.step_index = min(property.step_index, len(property.steps) - 1)
+		return {'FINISHED'}
+
+class StepToolsMergeGroups(Operator):
+	bl_idname = "action.steptools_merge_groups"
+	bl_label = "Merge Groups"
+	bl_description = "Replace duplicate StepTools node groups with one shared group"
+	bl_options = {"REGISTER", "UNDO"}
+
+	def execute(self, context):
+		group = get_group()
+		duplicates = [node_group for node_group in bpy.data.node_groups
+					  if node_group != group and node_group.bl_idname == "ShaderNodeTree"
+					  and GROUP_PATTERN.match(node_group.name)]
+
+		# Remap all users to the shared group and remove duplicates
+		for duplicate in duplicates:
+			duplicate.user_remap(group)
+		bpy.data.batch_remove(duplicates)
+		self.report({'INFO'}, f"Merged {len(duplicates)} node groups.")
+		return {'FINISHED'}
+
+class StepToolsBypassGroups(Operator):
+	bl_idname = "action.steptools_bypass_groups"
+	bl_label = "Bypass Unanimated"
+	bl_description = "Mute StepTools group in materials whose objects are never animated"
+	bl_options = {"REGISTER", "UNDO"}
+
+	def execute(self, context):
+		unanimated = set(unanimated_materials())
+		muted = 0
+		for material in bpy.data.materials:
+			if material.get("StepTools_Injected") and material.node_tree:
+				group_node = material.node_tree.nodes.get(GROUP_NAME)
+				if group_node is not None:
+					group_node.mute = material in unanimated
+					muted += group_node.mute
+		self.report({'INFO'}, f"Bypassed StepTools in {muted} materials.")
+		return {'FINISHED'}
+
+class StepToolsFinalizeRender(Operator):
+	bl_idname = "action.steptools_finalize_render"
+	bl_label = "Finalize for Render"
+	bl_description = "Remove StepTools group and restore original links in materials whose objects are never animated"
+	bl_options = {"REGISTER", "UNDO"}
+
+	def execute(self, context):
+		removed = sum(eject_group(material) for material in unanimated_materials())
+		self.report({'INFO'}, f"Removed StepTools from {removed} materials.")
+		return {'FINISHED'}
+
+class StepToolsCompactKeys(Operator):
+	bl_idname = "action.steptools_compact_keys"
+	bl_label = "Compact Keys"
+	bl_description = "Remove redundant keys and merge keys on the same frame in all StepTools curves"
+	bl_options = {"REGISTER", "UNDO"}
+
+	def execute(self, context):
+		fcurves = [fcurve for action in bpy.data.actions for fcurve in action.fcurves
+				   if fcurve.data_path.startswith(DATA_PATH_PREFIX)]
+		before = sum(len(fcurve.keyframe_points) for fcurve in fcurves)
+		removed = compact_curves(fcurves)
+		self.report({'INFO'}, f"Removed {removed} of {before} keys in {len(fcurves)} curves.")
+		return {'FINISHED'}
+
+class StepToolsRemoveAll(Operator):
+	bl_idname = "action.steptools_remove_all"
+	bl_label = "Remove StepTools"
+	bl_description = "Remove StepTools groups, properties, curves, drivers and controllers from the whole file"
+	bl_options = {"REGISTER", "UNDO"}
+
+	remove_markers: BoolProperty(name="Pause Markers", description="Remove 'P' markers of all scenes", default=True)
+
+	def execute(self, context):
+		removed = Counter()
+		size = 0
+
+		# Restore original Surface links
+		for material in bpy.data.materials:
+			if material.node_tree and ("StepTools_Injected" in material or find_group_node(material.node_tree.nodes)):
+				if eject_group(material):
+					removed["materials"] += 1
+					size += 2048
+
+		# Objects: curves, drivers and properties
+		controllers = []
+		emptied = []
+		for object in bpy.data.objects:
+			if object.get(CONTROLLER_NAME):
+				controllers.append(object)
+			animation_data = object.animation_data
+			if animation_data is not None:
+				drivers = [fcurve for fcurve in animation_data.drivers if fcurve.data_path.startswith(DATA_PATH_PREFIX)]
+				for fcurve in drivers:
+					animation_data.drivers.remove(fcurve)
+				removed["drivers"] += len(drivers)
+				size += len(drivers) * 512
+
+				action = animation_data.action
+				if action is not None:
+					# Visibility curves of Auto Hide, own visibility animation is kept
+					curves = [fcurve for fcurve in action.fcurves if fcurve.data_path.startswith(DATA_PATH_PREFIX)
+							  or is_visibility_curve(fcurve)]
+					for fcurve in curves:
+						removed["keys"] += len(fcurve.keyframe_points)
+						size += curve_size(fcurve)
+						data_path = fcurve.data_path
+						action.fcurves.remove(fcurve)
+						if data_path in HIDE_PATHS:
+							setattr(object, data_path, False)
+					removed["curves"] += len(curves)
+					if curves and not action.fcurves:
+						animation_data.action = None
+						emptied.append(action)
+			for name in (*PROPERTY_NAMES, FOLLOW_NAME):
+				if name in object:
+					del object[name]
+					removed["properties"] += 1
+					size += 64
+
+		# Datablocks left without content
+		actions = [action for action in set(emptied) if not action.fcurves and action.users == 0]
+		groups = [group for group in bpy.data.node_groups if GROUP_PATTERN.match(group.name)
+				  and group.bl_idname == "ShaderNodeTree" and group.users == 0]
+		texts = [text for text in (bpy.data.texts.get(LOG_NAME),) if text]
+		datablocks = controllers + actions + groups + texts
+		size += sum(estimate_size(id) for id in datablocks)
+		removed["controllers"] = len(controllers)
+		removed["actions"] = len(actions)
+		removed["node groups"] = len(groups)
+		bpy.data.batch_remove(datablocks)
+
+		# Scenes: palette, controller slots, step list and markers
+		for scene in bpy.data.scenes:
+			for index in range(1, PALETTE_SIZE + 1):
+				if f"StepTools_Palette_{index}" in scene:
+					del scene[f"StepTools_Palette_{index}"]
+			if scene.animation_data is not None:
+				drivers = [fcurve for fcurve in scene.animation_data.drivers if fcurve.data_path.startswith(DATA_PATH_PREFIX)]
+				for fcurve in drivers:
+					scene.animation_data.drivers.remove(fcurve)
+				removed["drivers"] += len(drivers)
+			for name in [name for name in scene.keys() if name.startswith(CONTROLLER_NAME + "_")]:
+				del scene[name]
+			scene.property.steps.clear()
+			if self.remove_markers:
+				markers = [marker for marker in scene.timeline_markers if parse_pause_marker(marker.name) is not None]
+				for marker in markers:
+					scene.timeline_markers.remove(marker)
+				removed["markers"] += len(markers)
+
+		summary = ", ".join(f"{count} {name}" for name, count in removed.items() if count)
+		self.report({'INFO'}, f"Removed {summary or 'nothing'} (~{size / 1048576:.2f} MB, {len(datablocks)} datablocks).")
+		return {'FINISHED'}
+
+	def invoke(self, context, event):
+		return context.window_manager.invoke_props_dialog(self)
+
+class StepToolsPurgeActions(Operator):
+	bl_idname = "action.steptools_purge_actions"
+	bl_label = "Purge Actions"
+	bl_description = "Remove orphaned actions with StepTools keyframes"
+	bl_options = {"REGISTER", "UNDO"}
+
+	def execute(self, context):
+		orphans = [action for action in bpy.data.actions if action.users == 0
+				   and any(fcurve.data_path.startswith(DATA_PATH_PREFIX) for fcurve in action.fcurves)]
+		bpy.data.batch_remove(orphans)
+		self.report({'INFO'}, f"Removed {len(orphans)} actions.")
+		return {'FINISHED'}
+
+# Frame to file of image strip, cached until directory changes
+class StripIndex:
+	def __init__(self, strip, directory, mtime):
+		self.directory = directory
+		self.mtime = mtime
+		self.frame_start = int(strip.frame_start)
+		self.files = [element.filename for element in strip.elements]
+		if strip.use_reverse_frames:
+			self.files.reverse()
+
+		# One directory listing instead of a check per file
+		try:
+			with os.scandir(directory) as entries:
+				existing = {entry.name for entry in entries}
+		except OSError:
+			existing = set()
+		self.missing = [self.frame_start + index for index, filename in enumerate(self.files) if filename not in existing]
+
+	def filename(self, frame):
+		return self.files[min(max(frame - self.frame_start, 0), len(self.files) - 1)]
+
+	def path(self, frame):
+		return os.path.join(self.directory, self.filename(frame))
+
+strip_indexes = {}
+
+def directory_mtime(directory):
+	try:
+		return os.stat(directory).st_mtime_ns
+	except OSError:
+		return None
+
+def get_strip_index(strip):
+	directory = bpy.path.abspath(strip.directory)
+	mtime = directory_mtime(directory)
+	key = (strip.name, directory, int(strip.frame_start), len(strip.elements), strip.use_reverse_frames)
+	index = strip_indexes.get(key)
+	if index is None or index.mtime != mtime:
+		index = strip_indexes[key] = StripIndex(strip, directory, mtime)
+	return index
+
+@persistent
+def clear_strip_indexes(*args):
+	strip_indexes.clear()
+
 # Pause
 class StepToolsMarker(Operator):
 	bl_idname = "action.steptools_marker"
@@ -447,31 +2408,126 @@ class StepToolsMarker(Operator):
 		context.scene.timeline_markers.new('P', frame=curent_frame)
 		return {'FINISHED'}
 
+# Pause markers: "P", "P 48" (own duration), "P 48 Intro" or "P Intro" (label)
+MARKER_FORMAT = "steptools-markers"
+MARKER_VERSION = 1
+DURATION_MIN = 5 # Same as duration_pause
+
+def parse_pause_marker(name):
+	parts = name.split(maxsplit=2)
+	if not parts or parts[0] != "P":
+		return None
+	item = {}
+	if len(parts) > 1 and parts[1].isdigit():
+		item["duration"] = max(int(parts[1]), DURATION_MIN)
+		parts = parts[2:]
+	else:
+		parts = parts[1:]
+	if parts:
+		item["label"] = " ".join(parts)
+	return item
+
+# Pause markers of scene sorted by frame, first marker wins on the same frame
+def pause_markers(scene):
+	markers = {}
+	for marker in scene.timeline_markers:
+		item = parse_pause_marker(marker.name)
+		if item is not None and marker.frame not in markers:
+			markers[marker.frame] = {"scene": scene.name, "frame": marker.frame, **item}
+	return [markers[frame] for frame in sorted(markers)]
+
+def write_markers(filepath, scenes):
+	count = 0
+	with open(filepath, 'w', encoding='utf-8') as f:
+		f.write(json.dumps({"format": MARKER_FORMAT, "version": MARKER_VERSION}) + "\n")
+		for scene in scenes:
+			for item in pause_markers(scene):
+				f.write(json.dumps(item) + "\n")
+				count += 1
+	return count
+
+# Markers of .jsonl or old .txt file, one line at a time
+def read_markers(filepath):
+	with open(filepath, encoding='utf-8') as f:
+		header = f.readline()
+		if not header.lstrip().startswith("{"):
+			# Old format: frames separated by spaces
+			for line in [header, *f]:
+				for marker in line.split():
+					if marker.isdigit():
+						yield {"frame": int(marker)}
+			return
+		version = json.loads(header).get("version", 0)
+		if version > MARKER_VERSION:
+			raise ValueError(f"Marker file version {version} is newer than supported {MARKER_VERSION}")
+		for line in f:
+			if line.strip():
+				item = json.loads(line)
+				if "duration" in item:
+					item["duration"] = max(int(item["duration"]), DURATION_MIN)
+				yield item
+
+# Markers of one scene: current scene if it is in the file, else the first scene
+def scene_markers(filepath, scene_name):
+	scenes = {}
+	for item in read_markers(filepath):
+		scenes.setdefault(item.get("scene"), {}).setdefault(item["frame"], item)
+	if not scenes:
+		return []
+	markers = scenes.get(scene_name) or next(iter(scenes.values()))
+	return [markers[frame] for frame in sorted(markers)]
+
+# Rendered image sequence as ffmpeg pattern (#### -> %04d)
+def frame_pattern(scene):
+	path = bpy.path.abspath(scene.render.filepath)
+	directory, name = os.path.split(path)
+	hashes = re.findall(r"#+", name)
+	if hashes:
+		head, _, tail = name.rpartition(hashes[-1])
+		name = f"{head}%0{len(hashes[-1])}d{tail}"
+	else:
+		name += "%04d"
+	if scene.render.use_file_extension:
+		name += scene.render.file_extension
+	return os.path.join(directory, name)
+
 class StepToolsMarkerSave(Operator):
 	bl_idname = "action.steptools_marker_save"
 	bl_label = "Save Markers"
-	bl_description = "Save markers with name 'P' to .txt file"
+	bl_description = "Save markers with name 'P' to .jsonl file (or old .txt format)"
 	
 	filepath: StringProperty(subtype="FILE_PATH")
+	file_format: EnumProperty(
+		name="Format",
+		items=[
+			("jsonl", "JSON Lines", "Scene, frame, duration and label of each marker"),
+			("txt", "Text", "Frames only, for older versions"),
+		],
+		default="jsonl"
+	)
+	all_scenes: BoolProperty(
+		name="All Scenes",
+		description="Save markers of all scenes",
+		default=False
+	)
 
 	def execute(self, context):
 		directory = os.path.dirname(self.filepath)
 		if not os.path.exists(directory):
 			self.report({'ERROR'}, "Директория не существует")
 			return {'CANCELLED'}
-		
-		# Get markers
-		markers = []
-		for marker in bpy.context.scene.timeline_markers:
-			if marker.name == "P" and marker.frame not in markers:
-				markers.extend([marker.frame])
-		markers = sorted(markers)
 
 		# Save markers
-		with open(self.filepath + '.txt', 'w', encoding='utf-8') as f:
-			for marker in markers:
-				f.write(f"{marker} ")
-			self.report({'INFO'}, 'Markers saved.')
+		if self.file_format == "txt":
+			markers = pause_markers(context.scene)
+			with open(self.filepath + '.txt', 'w', encoding='utf-8') as f:
+				for marker in markers:
+					f.write(f"{marker['frame']} ")
+			count = len(markers)
+		else:
+			scenes = bpy.data.scenes if self.all_scenes else [context.scene]
+			count = write_markers(bpy.path.ensure_ext(self.filepath, ".jsonl"), scenes)
+		self.report({'INFO'}, f'{count} markers saved.')
 		return {'FINISHED'}
 
 	def invoke(self, context, event):
@@ -479,6 +2535,77 @@ class StepToolsMarkerSave(Operator):
 		context.window_manager.fileselect_add(self)
 		return {'RUNNING_MODAL'}
 
+class StepToolsPauseExport(Operator):
+	bl_idname = "action.steptools_pause_export"
+	bl_label = "Export Pause for ffmpeg"
+	bl_description = "Export 'P' markers as ffmpeg concat list or filter script, pauses are added while encoding rendered images"
+
+	filepath: StringProperty(subtype="FILE_PATH")
+	export_type: EnumProperty(
+		name="Type",
+		items=[
+			("concat", "Concat List", "List of rendered images with durations for the concat demuxer"),
+			("filter", "Filter Script", "Loop filters for the rendered image sequence"),
+		],
+		default="concat"
+	)
+
+	def execute(self, context):
+		directory = os.path.dirname(self.filepath)
+		if not os.path.exists(directory):
+			self.report({'ERROR'}, "Директория не существует")
+			return {'CANCELLED'}
+
+		scene = context.scene
+		frame_start, frame_end = scene.frame_start, scene.frame_end
+		fps = scene.render.fps / scene.render.fps_base
+		duration_pause = scene.property.duration_pause
+		markers = {marker["frame"]: marker.get("duration", duration_pause) for marker in pause_markers(scene)
+				   if frame_start <= marker["frame"] <= frame_end}
+		output = os.path.join(directory, bpy.path.basename(bpy.path.abspath(scene.render.filepath)).strip("#._") or "output") + ".mp4"
+
+		if self.export_type == "concat":
+			filepath = bpy.path.ensure_ext(self.filepath, ".txt")
+			command = f'ffmpeg -f concat -safe 0 -i "{filepath}" -fps_mode cfr -r {fps:g} -pix_fmt yuv420p "{output}"'
+			self.write_concat(scene, filepath, markers, fps, command)
+		else:
+			filepath = bpy.path.ensure_ext(self.filepath, ".ffscript")
+			command = (f'ffmpeg -framerate {fps:g} -start_number {frame_start} -i "{frame_pattern(scene)}" '
+					   f'-filter_script:v "{filepath}" -pix_fmt yuv420p "{output}"')
+			self.write_filter(filepath, markers, frame_start)
+
+		self.report({'INFO'}, f"{len(markers)} pauses exported. {command}")
+		return {'FINISHED'}
+
+	def write_concat(self, scene, filepath, markers, fps, command):
+		with open(filepath, 'w', encoding='utf-8') as f:
+			f.write(f"ffconcat version 1.0\n# {command}\n")
+			for frame in range(scene.frame_start, scene.frame_end + 1):
+				# Hold marker frame for pause length
+				length = 1 + markers.get(frame, 0)
+				image = scene.render.frame_path(frame=frame).replace("'", "'\\''")
+				f.write(f"file '{image}'\nduration {length / fps:.6f}\n")
+			# Duration of last entry is used only when the file is repeated
+			f.write(f"file '{image}'\n")
+
+	def write_filter(self, filepath, markers, frame_start):
+		# Each loop shifts following frames by the pause length
+		filters = []
+		shift = 0
+		for marker, duration in markers.items():
+			filters.append(f"loop=loop={duration}:size=1:start={marker - frame_start + shift}")
+			shift += duration
+		filters.append("setpts=N/FRAME_RATE/TB")
+		with open(filepath, 'w', encoding='utf-8') as f:
+			f.write(",\n".join(filters) + "\n")
+
+	def invoke(self, context, event):
+		self.filepath = bpy.context.scene.render.filepath
+		context.window_manager.fileselect_add(self)
+		return {'RUNNING_MODAL'}
+
+PLAN_NAME = "StepTools Pause Plan"
+
 class StepToolsPause(Operator):
 	bl_idname = "action.steptools_pause"
 	bl_label = "Create Pause"
@@ -487,58 +2614,131 @@ class StepToolsPause(Operator):
 	
 	filepath: StringProperty(subtype="FILE_PATH")
 	filter_glob: StringProperty(
-		default="*.txt",
+		default="*.jsonl;*.txt",
 		options={'HIDDEN'},
 		maxlen=255
 	)
+	use_hold: BoolProperty(
+		name="Single Strip",
+		description="Build one image strip with held images instead of splitting the strip and adding a strip per pause",
+		default=False
+	)
+	marker_scene: StringProperty(
+		name="Scene",
+		description="Scene of markers in .jsonl file (current or first scene if empty)"
+	)
+	dry_run: BoolProperty(
+		name="Dry Run",
+		description="Only write planned splits and holds to the 'StepTools Pause Plan' text, strips are not changed",
+		default=False
+	)
 
 	def execute(self, context):
 		active_strip = bpy.context.scene.sequence_editor.active_strip
 		if len(bpy.context.selected_sequences) == 1 and active_strip.type == "IMAGE":
 			markers = self.get_markers(context, self.filepath)
 			if markers:
-				active_strip_path = bpy.path.abspath(active_strip.directory)
-				self.create_pause(context, markers, active_strip, active_strip_path)
+				index = get_strip_index(active_strip)
+				start_frame = active_strip.frame_final_start
+				active_strip_length = active_strip.frame_final_end
+				plan = self.plan_pause(context, markers, active_strip, index)
+				self.check_files(active_strip, index)
+				if self.dry_run:
+					self.report_plan(context, plan)
+					return {'FINISHED'}
+				if self.use_hold:
+					self.create_hold(context, plan, active_strip, index)
+				else:
+					self.create_pause(context, plan, active_strip, index)
+				bpy.context.scene.frame_end = active_strip_length + sum(pause["duration"] for pause in plan) - 1
+				bpy.context.scene.frame_start = start_frame
 		return {'FINISHED'}
 	
 	def get_markers(self, context, active_strip_path):
-		markers = []
-		with open(active_strip_path) as f:
-			for marker in f.readline().split():
-				if marker.isdigit():
-					markers.append(int(marker))
-		return markers
-
-	def create_pause(self, context, markers, active_strip, active_strip_path):
-		step = 0
+		try:
+			return scene_markers(active_strip_path, self.marker_scene or context.scene.name)
+		except (OSError, ValueError) as error:
+			self.report({'ERROR'}, f"Can't read markers: {error}")
+			return []
+
+	# Split points and hold images of all pauses before changing the strip
+	def plan_pause(self, context, markers, active_strip, index):
 		start_frame = active_strip.frame_final_start
-		active_strip_length = active_strip.frame_final_end
+		end_frame = active_strip.frame_final_end
 		duration_pause = context.scene.property.duration_pause
+
+		plan = []
+		shift = 0
 		for marker in markers:
-			end_strip = bpy.context.selected_sequences[-1]
-			marker_offset = marker + start_frame + step # '-set 'start_frame' if start not 0 frame   		
-			if marker_offset in range(end_strip.frame_final_start, end_strip.frame_final_end + 1):
-				next_strip = end_strip.split(marker_offset, "SOFT")
-				if next_strip is None:
-					next_strip = end_strip
-
-				# Next strip
-				next_strip.frame_start += duration_pause
-				if marker == markers[-1] and marker_offset == end_strip.frame_final_end - duration_pause:
-					next_strip.frame_start -= duration_pause
-
-				# Add images to sequence
-				sequence_image = next_strip.strip_elem_from_frame(marker_offset + duration_pause).filename
-				image = active_strip_path + sequence_image
-				sequences = bpy.context.scene.sequence_editor.sequences
-				image_strip = sequences.new_image("Image", image, active_strip.channel, marker_offset)
-				image_strip.select = False
-				image_strip.frame_final_duration = duration_pause
-				image_strip.color_tag = "COLOR_05"
-				
-				step += context.scene.property.duration_pause
-		bpy.context.scene.frame_end = active_strip_length + step - 1
-		bpy.context.scene.frame_start = start_frame
+			frame = marker["frame"] + start_frame # '-set 'start_frame' if start not 0 frame
+			if not start_frame <= frame <= end_frame:
+				continue
+			duration = marker.get("duration", duration_pause)
+			plan.append({
+				"marker": marker["frame"],
+				"label": marker.get("label", ""),
+				"frame": frame,
+				"offset": frame + shift,
+				"duration": duration,
+				"split": start_frame < frame < end_frame,
+				"shift": frame < end_frame,
+				"image": index.filename(frame),
+			})
+			shift += duration
+		return plan
+
+	# Images of visible part must exist on disk
+	def check_files(self, active_strip, index):
+		missing = [frame for frame in index.missing
+				   if active_strip.frame_final_start <= frame < active_strip.frame_final_end]
+		if missing:
+			self.report({'WARNING'}, f"{len(missing)} images missing in {index.directory}, first at frame {missing[0]}")
+
+	def report_plan(self, context, plan):
+		lines = []
+		for pause in plan:
+			action = "split" if pause["split"] else "shift" if pause["shift"] else "append"
+			lines.append(f"P {pause['marker']} {pause['label']}: {action} at {pause['offset']}, hold {pause['image']} for {pause['duration']} frames")
+		text = bpy.data.texts.get(PLAN_NAME) or bpy.data.texts.new(PLAN_NAME)
+		text.from_string("\n".join(lines))
+		self.report({'INFO'}, f"{len(plan)} pauses planned, {sum(pause['duration'] for pause in plan)} frames added, see '{PLAN_NAME}' text.")
+
+	# One ordered pass, the right part of each split is the next strip
+	def create_pause(self, context, plan, active_strip, index):
+		sequences = bpy.context.scene.sequence_editor.sequences
+		end_strip = active_strip
+		for pause in plan:
+			if pause["split"]:
+				end_strip = end_strip.split(pause["offset"], "SOFT") or end_strip
+			if pause["shift"]:
+				end_strip.frame_start += pause["duration"]
+
+			# Add images to sequence
+			image_strip = sequences.new_image("Image", os.path.join(index.directory, pause["image"]), active_strip.channel, pause["offset"])
+			image_strip.select = False
+			image_strip.frame_final_duration = pause["duration"]
+			image_strip.color_tag = "COLOR_05"
+		return {"FINISHED"}
+
+	# Images of the visible strip part with held images, as one new strip
+	def create_hold(self, context, plan, active_strip, index):
+		holds = {pause["frame"]: pause for pause in plan}
+
+		files = []
+		for frame in range(active_strip.frame_final_start, active_strip.frame_final_end + 1):
+			if frame in holds:
+				files.extend([holds[frame]["image"]] * holds[frame]["duration"])
+			if frame < active_strip.frame_final_end:
+				files.append(index.filename(frame))
+
+		sequences = bpy.context.scene.sequence_editor.sequences
+		hold_strip = sequences.new_image(active_strip.name + "_Pause", os.path.join(index.directory, files[0]),
+										 active_strip.channel + 1, active_strip.frame_final_start)
+		for filename in files[1:]:
+			hold_strip.elements.append(filename)
+		hold_strip.frame_final_duration = len(files)
+		hold_strip.color_tag = "COLOR_05"
+		active_strip.mute = True
 		return {"FINISHED"}
 	
 	def invoke(self, context, event):
@@ -583,6 +2783,13 @@ class STEPTOOLS_PT_subpanel_blink(StepToolsDopeSheet, Panel):
 		if context.scene.property.step_type == 'color':
 			steptools_action = StepToolsBlink.bl_idname
 
+			col.prop(context.scene.property, "use_palette")
+			if context.scene.property.use_palette:
+				row = col.row()
+				row.template_list("STEPTOOLS_UL_palette", "", context.scene.property, "palette", context.scene.property, "palette_active", rows=3)
+				sub = row.column(align=True)
+				sub.operator(StepToolsPaletteAdd.bl_idname, icon="ADD", text="")
+				sub.operator(StepToolsPaletteRemove.bl_idname, icon="REMOVE", text="")
 			col.prop(context.scene.property, "color_blink")
 			col.prop(context.scene.property, "blend_blink")
 			col.prop(context.scene.property, "duration_blink")
@@ -601,12 +2808,69 @@ class STEPTOOLS_PT_subpanel_blink(StepToolsDopeSheet, Panel):
 			if context.scene.property.transparent_type == "fade_inout":
 				col.prop(context.scene.property, "delay_length")
 
+		col.prop(context.scene.property, "stagger_order")
+		if context.scene.property.stagger_order != "none":
+			col.prop(context.scene.property, "stagger_frames")
+
 		col.separator()
 		row = col.row()
 		row.operator(steptools_action, text="Set Keyframes", icon="KEYFRAME_HLT")
 		row.scale_x = 1
+		row.operator(StepToolsModal.bl_idname, text="", icon="TIME")
 		row.operator(StepToolsMarker.bl_idname, text="", icon="MARKER_HLT")
 
+class STEPTOOLS_UL_palette(UIList):
+	def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+		row = layout.row()
+		row.label(text=str(index + 1))
+		row.prop(item, "name", text="", emboss=False)
+		row.prop(item, "color", text="")
+
+class STEPTOOLS_UL_steps(UIList):
+	def draw_item(self, context, layout, data, item, icon, active_data, active_propname):
+		row = layout.row()
+		row.prop(item, "name", text="", emboss=False)
+		row.label(text=f"{item.keyed_start}-{item.keyed_end}")
+
+class STEPTOOLS_PT_subpanel_steps(StepToolsDopeSheet, Panel):
+	bl_parent_id = "STEPTOOLS_PT_dopesheet_panel"
+	bl_label = "Steps"
+
+	def draw(self, context):
+		layout = self.layout
+		property = context.scene.property
+		row = layout.row()
+		row.prop(property, "record_steps")
+		row.operator(StepToolsApplySteps.bl_idname, icon="FILE_SCRIPT", text="Apply Script")
+
+		row = layout.row()
+		row.template_list("STEPTOOLS_UL_steps", "", property, "steps", property, "step_index", rows=4)
+		row.operator(StepToolsStepRemove.bl_idname, icon="REMOVE", text="")
+
+		if not 0 <= property.step_index < len(property.steps):
+			return
+		step = property.steps[property.step_index]
+		col = layout.column()
+		col.use_property_split = True
+		col.use_property_decorate = False
+		col.prop(step, "step_type")
+		col.prop(step, "frame_start")
+		if step.step_type == "color":
+			col.prop(step, "palette_index")
+			col.prop(step, "color_blink")
+			col.prop(step, "blend_blink")
+			col.prop(step, "duration_blink")
+			col.prop(step, "count_blink")
+		else:
+			col.prop(step, "blend_transparent")
+			col.prop(step, "duration_fade")
+			if step.step_type == "blink":
+				col.prop(step, "count_transparent_blink")
+			if step.step_type == "fade_inout":
+				col.prop(step, "delay_length")
+		col.label(text=f"Objects: {len(step.objects)}")
+		col.operator(StepToolsStepUpdate.bl_idname, icon="FILE_REFRESH")
+
 class STEPTOOLS_PT_subpanel_settings(StepToolsDopeSheet, Panel):
 	bl_parent_id = "STEPTOOLS_PT_dopesheet_panel"
 	bl_label = "Settings"
@@ -632,11 +2896,76 @@ class STEPTOOLS_PT_subpanel_settings(StepToolsDopeSheet, Panel):
 		col_right.use_property_split = False
 		col_right.prop(context.scene.property, "single_user_material")
 		col_right.prop(context.scene.property, "single_user_data")
+		col_right.prop(context.scene.property, "zero_copy")
+
+		col.prop(context.scene.property, "use_controller")
+		col.prop(context.scene.property, "bulk_keying")
+		col.prop(context.scene.property, "defer_updates")
+		col.prop(context.scene.property, "compact_keys")
+		col.prop(context.scene.property, "auto_hide")
+		col.prop(context.scene.property, "log_timings")
+		if depsgraph_stats:
+			col.label(text=f"Last run: {depsgraph_summary()}")
+
+		split = col.split(factor=0.4)
+		split.alignment = 'RIGHT'
+		split.label(text="Node Groups:")
+		split.operator(StepToolsMergeGroups.bl_idname, icon="NODETREE", text="")
+
+		split = col.split(factor=0.4)
+		split.alignment = 'RIGHT'
+		split.label(text="Redundant Keys:")
+		split.operator(StepToolsCompactKeys.bl_idname, icon="KEYFRAME", text="")
+
+		split = col.split(factor=0.4)
+		split.alignment = 'RIGHT'
+		split.label(text="Orphan Actions:")
+		split.operator(StepToolsPurgeActions.bl_idname, icon="ORPHAN_DATA", text="")
+
+		split = col.split(factor=0.4)
+		split.alignment = 'RIGHT'
+		split.label(text="Remove All:")
+		split.operator(StepToolsRemoveAll.bl_idname, icon="TRASH", text="")
+
+		split = col.split(factor=0.4)
+		split.alignment = 'RIGHT'
+		split.label(text="Render:")
+		row = split.row(align=True)
+		row.operator(StepToolsBypassGroups.bl_idname, icon="HIDE_ON", text="")
+		row.operator(StepToolsFinalizeRender.bl_idname, icon="RENDER_STILL", text="")
 
 		split = col.split(factor=0.4)
 		split.alignment = 'RIGHT'
 		split.label(text="Save Marker:")
-		split.operator(StepToolsMarkerSave.bl_idname, icon="FILE_TICK", text="")
+		row = split.row(align=True)
+		row.operator(StepToolsMarkerSave.bl_idname, icon="FILE_TICK", text="")
+		row.operator(StepToolsPauseExport.bl_idname, icon="FILE_MOVIE", text="")
+
+class STEPTOOLS_PT_subpanel_inventory(StepToolsDopeSheet, Panel):
+	bl_parent_id = "STEPTOOLS_PT_dopesheet_panel"
+	bl_label = "Inventory"
+	bl_options = {"DEFAULT_CLOSED"}
+
+	def draw(self, context):
+		layout = self.layout
+		# Cached values only, computed by timer
+		inventory_state["wanted"] = True
+		if inventory_state["dirty"]:
+			request_inventory()
+		layout.operator(StepToolsInventoryRefresh.bl_idname, icon="FILE_REFRESH")
+		if not inventory:
+			layout.label(text="Counting...")
+			return
+
+		col = layout.column(align=True)
+		col.label(text=f"Objects: {inventory['objects']} ({inventory['controllers']} controllers, {inventory['followers']} followers)")
+		col.label(text=f"Materials: {inventory['materials']} ({inventory['bypassed']} bypassed)")
+		col.label(text=f"Node Groups: {inventory['groups']} ({inventory['duplicates']} duplicates)")
+		col.label(text=f"F-Curves: {inventory['curves']}, keys {inventory['keys']}")
+		col.label(text=f"Drivers: {inventory['drivers']}")
+		col.label(text=f"Orphan Actions: {inventory['orphan_actions']}")
+		col.label(text=f"Pause Markers: {inventory['markers']}")
+		col.label(text=f"Evaluation: ~{inventory['cost'] / 1000:.2f} ms/frame")
 
 # Draw UI in Sequencer
 class StepToolsSequencer:
@@ -684,24 +3013,47 @@ class STEPTOOLS_MT_submenu(Menu):
 		layout = self.layout
 		layout.operator(StepToolsBlink.bl_idname)
 		layout.operator(StepToolsTransparent.bl_idname)
+		layout.operator(StepToolsModal.bl_idname)
 		layout.separator()
 		layout.operator(StepToolsMarker.bl_idname)
 
 classes = (
+	StepTools_step_object,
+	StepTools_step,
+	StepTools_palette_color,
 	StepTools_properties,
+	StepTools_preferences,
 	StepToolsMain,
 	StepToolsBlink,
 	StepToolsFadeIn,
 	StepToolsFadeOut,
 	StepToolsFadeInOut,
 	StepToolsTransparent,
+	StepToolsModal,
+	StepToolsApplySteps,
 	StepToolsCursor,
+	StepToolsPaletteAdd,
+	StepToolsPaletteRemove,
+	StepToolsStepUpdate,
+	StepToolsStepRemove,
+	StepToolsMergeGroups,
+	StepToolsBypassGroups,
+	StepToolsFinalizeRender,
+	StepToolsCompactKeys,
+	StepToolsRemoveAll,
+	StepToolsPurgeActions,
+	StepToolsInventoryRefresh,
 	StepToolsMarkerSave,
+	StepToolsPauseExport,
 	StepToolsMarker,
 	StepToolsPause,
 	STEPTOOLS_PT_dopesheet_panel,
 	STEPTOOLS_PT_subpanel_blink,
+	STEPTOOLS_UL_palette,
+	STEPTOOLS_UL_steps,
+	STEPTOOLS_PT_subpanel_steps,
 	STEPTOOLS_PT_subpanel_settings,
+	STEPTOOLS_PT_subpanel_inventory,
 	STEPTOOLS_MT_menu,
 	STEPTOOLS_MT_submenu,
 	STEPTOOLS_PT_sequencer_panel
@@ -713,6 +3065,10 @@ def register():
 
 	bpy.types.Scene.property = PointerProperty(type = StepTools_properties)
 	bpy.types.DOPESHEET_MT_key.append(STEPTOOLS_MT_menu.draw)
+	bpy.app.handlers.depsgraph_update_post.append(update_selection_order)
+	bpy.app.handlers.load_post.append(clear_strip_indexes)
+	bpy.app.handlers.load_post.append(mark_inventory)
+	bpy.app.handlers.depsgraph_update_post.append(depsgraph_inventory)
 
 def unregister():
 	for cls in reversed(classes):
@@ -720,6 +3076,13 @@ def unregister():
 	
 	del bpy.types.Scene.property
 	bpy.types.DOPESHEET_MT_key.remove(STEPTOOLS_MT_menu.draw)
+	bpy.app.handlers.depsgraph_update_post.remove(update_selection_order)
+	bpy.app.handlers.load_post.remove(clear_strip_indexes)
+	bpy.app.handlers.load_post.remove(mark_inventory)
+	bpy.app.handlers.depsgraph_update_post.remove(depsgraph_inventory)
+	if bpy.app.timers.is_registered(update_inventory):
+		bpy.app.timers.unregister(update_inventory)
+	unwatch_depsgraph()
 
 if __name__ == "__main__" :
 	register()
\ No newline at end of file
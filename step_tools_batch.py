@@ -0,0 +1,142 @@
+# Step Tools
+# Copyright (C) 2025 VGmove
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Apply a step script to many .blend files with background Blender workers.
+#
+#   python step_tools_batch.py steps.json a.blend b.blend --jobs 4 --summary summary.json
+#
+# Step script (JSON or TOML):
+#
+#   {
+#     "settings": {"move_cursor": true, "bulk_keying": true},
+#     "steps": [
+#       {"action": "blink", "objects": ["Bolt*"], "frame": 1, "params": {"count_blink": 3}},
+#       {"action": "fade_in", "collections": ["Cover"], "marker": true}
+#     ]
+#   }
+#
+# Actions: blink, transparent, fade_in, fade_out, fade_inout, marker.
+# "params" and "settings" are StepTools scene properties.
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+ADDON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "step_tools.py")
+
+def load_script(path):
+	if path.endswith(".toml"):
+		import tomllib
+		with open(path, "rb") as f:
+			return tomllib.load(f)
+	with open(path, encoding="utf-8") as f:
+		return json.load(f)
+
+# Launcher
+def run_file(args, blend_path):
+	with tempfile.TemporaryDirectory() as directory:
+		result_path = os.path.join(directory, "result.json")
+		command = [args.blender, "-b", blend_path, "--factory-startup",
+				   "--python", os.path.abspath(__file__), "--",
+				   "--worker", os.path.abspath(args.script), "--result", result_path]
+		if args.output_dir:
+			command += ["--save-as", os.path.join(os.path.abspath(args.output_dir), os.path.basename(blend_path))]
+		elif args.save:
+			command += ["--save-as", os.path.abspath(blend_path)]
+
+		start = time.perf_counter()
+		process = subprocess.run(command, capture_output=True, text=True)
+		seconds = time.perf_counter() - start
+
+		if os.path.exists(result_path):
+			with open(result_path, encoding="utf-8") as f:
+				result = json.load(f)
+		else:
+			result = {"status": "error", "error": (process.stderr.strip().splitlines() or ["No result"])[-1]}
+	result.update(file=blend_path, returncode=process.returncode, wall_seconds=round(seconds, 3))
+	return result
+
+def launcher(argv):
+	parser = argparse.ArgumentParser(description="Apply a StepTools step script to .blend files")
+	parser.add_argument("script", help="Step script (.json or .toml)")
+	parser.add_argument("files", nargs="+", help=".blend files")
+	parser.add_argument("--blender", default=os.environ.get("BLENDER", "blender"), help="Blender executable")
+	parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Number of parallel Blender workers")
+	parser.add_argument("--summary", default="step_tools_summary.json", help="Summary .json file")
+	parser.add_argument("--save", action="store_true", help="Save files in place")
+	parser.add_argument("--output-dir", help="Save files to this directory")
+	args = parser.parse_args(argv)
+
+	# Parse script before starting workers (steps are checked by StepTools)
+	load_script(args.script)
+	if args.output_dir:
+		os.makedirs(args.output_dir, exist_ok=True)
+
+	# One file per Blender process
+	with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+		results = list(pool.map(lambda path: run_file(args, path), args.files))
+
+	with open(args.summary, "w", encoding="utf-8") as f:
+		json.dump(results, f, indent=2)
+
+	for result in results:
+		print(f"{result['file']}: {result['status']} {result['wall_seconds']}s, keys {result.get('keys', 0)}")
+	return 0 if all(result["status"] == "ok" for result in results) else 1
+
+# Worker (inside Blender)
+def worker(argv):
+	import bpy
+	sys.path.insert(0, os.path.dirname(ADDON_PATH))
+	import step_tools
+
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--worker", required=True)
+	parser.add_argument("--result", required=True)
+	parser.add_argument("--save-as")
+	args = parser.parse_args(argv)
+
+	result = {"status": "ok", "steps": [], "keys": 0}
+	start = time.perf_counter()
+	try:
+		step_tools.register()
+		script = step_tools.load_script(args.worker)
+		steps, settings = step_tools.check_script(bpy.context.scene.property, script)
+
+		# All steps in one StepTools call, settings and name patterns are handled by StepTools
+		result["steps"] = step_tools.apply_steps(steps, settings)
+		if len(result["steps"]) != len(steps):
+			raise RuntimeError("Steps were not applied, see Blender output")
+		result["keys"] = sum(step["keys"] for step in result["steps"])
+
+		if args.save_as:
+			bpy.ops.wm.save_as_mainfile(filepath=args.save_as)
+	except Exception as error:
+		result.update(status="error", error=f"{type(error).__name__}: {error}")
+	result["seconds"] = round(time.perf_counter() - start, 4)
+
+	with open(args.result, "w", encoding="utf-8") as f:
+		json.dump(result, f)
+
+if __name__ == "__main__":
+	if "--" in sys.argv and "--worker" in sys.argv:
+		worker(sys.argv[sys.argv.index("--") + 1:])
+	else:
+		sys.exit(launcher(sys.argv[1:]))